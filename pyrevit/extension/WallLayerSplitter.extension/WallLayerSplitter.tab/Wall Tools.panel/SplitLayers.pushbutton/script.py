@@ -2,8 +2,14 @@
 """Разделение многослойных стен на отдельные стены по слоям."""
 
 
+import bisect
+import collections
+import contextlib
 import enum
+import functools
+import itertools
 import math
+import operator
 import os
 import re
 import sys
@@ -18,6 +24,7 @@ try:  # pragma: no cover - импорт работает только внутр
         XYZ,
         AssemblyInstance,
         BuiltInParameter,
+        CheckoutStatus,
         CompoundStructureLayer,
         DesignOption,
         ElementClassFilter,
@@ -28,8 +35,6 @@ try:  # pragma: no cover - импорт работает только внутр
         IntersectionResult,
         JoinGeometryUtils,
         LocationCurve,
-        LocationPoint,
-        Material,
         MaterialFunctionAssignment,
         PartUtils,
         Phase,
@@ -41,6 +46,7 @@ try:  # pragma: no cover - импорт работает только внутр
         WallType,
         WallUtils,
         WorksetId,
+        WorksharingUtils,
     )
     from Autodesk.Revit.Exceptions import (  # noqa: F401
         ArgumentException,
@@ -54,6 +60,7 @@ except Exception:  # pragma: no cover - использование заглуш
         ArgumentException,
         AssemblyInstance,
         BuiltInParameter,
+        CheckoutStatus,
         CompoundStructureLayer,
         DesignOption,
         ElementClassFilter,
@@ -66,8 +73,6 @@ except Exception:  # pragma: no cover - использование заглуш
         InvalidOperationException,
         JoinGeometryUtils,
         LocationCurve,
-        LocationPoint,
-        Material,
         MaterialFunctionAssignment,
         ObjectType,
         OperationCanceledException,
@@ -82,6 +87,7 @@ except Exception:  # pragma: no cover - использование заглуш
         WallType,
         WallUtils,
         WorksetId,
+        WorksharingUtils,
         XYZ,
     )
     REVIT_API_AVAILABLE = False
@@ -91,6 +97,11 @@ try:  # pragma: no cover - модуль доступен только в сре
 except Exception:  # pragma: no cover - fallback на заглушки
     from revit_stub import revit, script  # type: ignore
 
+try:  # pragma: no cover - .NET-коллекции доступны только в IronPython/pythonnet
+    from System.Collections.Generic import List  # type: ignore
+except Exception:  # pragma: no cover - вне Revit коллекторы принимают обычный список
+    List = None
+
 from logger import get_logger  # noqa: E402
 
 NOT_IN_REVIT_MESSAGE = (
@@ -103,26 +114,35 @@ OUTPUT = script.get_output()
 MAX_LAYER_TYPE_NAME_LENGTH = 200
 MAX_LAYER_TYPE_NAME_ATTEMPTS = 50
 SAFE_LAYER_TYPE_BASE_NAME_LENGTH = 60
+MAX_DIAGNOSTIC_LOG_LENGTH = 100
+# Смещение меньше этого значения (в футах) считается нулевым: линия слоя
+# совпадает с линией исходной стены.
+_ZERO_OFFSET_EPS = 1e-9
+
+# Источник ID семейств стены: индекс по Host/HostFace уже проверил
+# привязку к стене, зависимые элементы — нет.
+HOSTED_IDS_FROM_HOST_MAP = "host_map"
+HOSTED_IDS_FROM_DEPENDENTS = "dependents"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# Символы, недопустимые в именах типов Revit.
+_INVALID_NAME_CHARS = frozenset(':;{}[]|\\/<>?*"')
+# Таблица для str.translate: запрещённые в именах типов символы и управляющие
+# символы (код < 32) заменяются на "_".
+_INVALID_TYPE_NAME_TRANSLATE = dict.fromkeys(
+    [ord(char) for char in _INVALID_NAME_CHARS] + list(range(32)),
+    ord("_"),
+)
 
 
 def make_valid_wall_type_name(raw_name, max_length=SAFE_LAYER_TYPE_BASE_NAME_LENGTH, fallback_name="Тип слоя"):
     """Очистить и безопасно обрезать имя типа стены."""
 
-    invalid_chars = {":", ";", "{", "}", "[", "]", "|", "\\", "/", "<", ">", "?", "*", '"'}
     trimmed = (raw_name or "").strip()
     if not trimmed:
         trimmed = fallback_name
 
-    sanitized_chars = []
-    for char in trimmed:
-        code = ord(char)
-        if code < 32 or char in invalid_chars:
-            sanitized_chars.append("_")
-        else:
-            sanitized_chars.append(char)
-
-    sanitized = "".join(sanitized_chars)
-    sanitized = re.sub(r"\s+", " ", sanitized).strip()
+    sanitized = _WHITESPACE_RE.sub(" ", trimmed.translate(_INVALID_TYPE_NAME_TRANSLATE)).strip()
 
     if not sanitized:
         sanitized = fallback_name
@@ -136,40 +156,37 @@ def make_valid_wall_type_name(raw_name, max_length=SAFE_LAYER_TYPE_BASE_NAME_LEN
     return sanitized
 
 
+@functools.lru_cache(maxsize=4096)
+def _normalize_wall_type_name(name):
+    # casefold корректнее lower() сравнивает имена без учёта регистра,
+    # в том числе кириллические.
+    return name.strip().casefold() if name else ""
+
+
 def get_element_id_value(element_id):
-    if isinstance(element_id, ElementId):
-        try:
-            return element_id.IntegerValue
-        except Exception:  # noqa: BLE001
-            try:
-                return int(element_id)
-            except Exception:  # noqa: BLE001
-                return None
-    if isinstance(element_id, int):
+    if type(element_id) is int:
         return element_id
-    try:
-        return int(element_id)
-    except (TypeError, ValueError):
-        return None
+    # getattr с значением по умолчанию не создаёт обработчик исключений и
+    # одинаково работает для ElementId, его обёрток и None.
+    value = getattr(element_id, "IntegerValue", None)
+    if value is not None:
+        return value
+    if isinstance(element_id, (int, str)):
+        try:
+            return int(element_id)
+        except ValueError:
+            return None
+    return None
 
 
 def format_element_id(element_id, fallback_value=None):
     if fallback_value is not None:
-        try:
-            return str(int(fallback_value))
-        except (TypeError, ValueError):
-            return str(fallback_value)
+        return str(fallback_value)
 
     value = get_element_id_value(element_id)
     if value is not None:
         return str(value)
 
-    if isinstance(element_id, ElementId):
-        try:
-            return str(element_id.IntegerValue)
-        except Exception:  # noqa: BLE001
-            pass
-
     if element_id is None:
         return "неизвестно"
 
@@ -301,9 +318,19 @@ def _safe_get_builtin_parameter(parameter_name):
         )
 
 
+# Успешно разрешённые имена BuiltInParameter: getattr по перечислению
+# Revit API выполняется через interop, а набор имён в команде ограничен.
+_RESOLVED_BUILTIN_PARAMETERS = {}
+
+
 def try_resolve_builtin_parameter(parameter_name):
+    value = _RESOLVED_BUILTIN_PARAMETERS.get(parameter_name, _MISSING_VALUE)
+    if value is not _MISSING_VALUE:
+        return value, ""
+
     value, primary_message = _safe_get_builtin_parameter(parameter_name)
     if value is not _MISSING_VALUE:
+        _RESOLVED_BUILTIN_PARAMETERS[parameter_name] = value
         return value, ""
 
     fallback_names = _BUILTIN_PARAMETER_FALLBACKS.get(parameter_name, ())
@@ -315,6 +342,7 @@ def try_resolve_builtin_parameter(parameter_name):
                 parameter_name,
                 fallback_name,
             )
+            _RESOLVED_BUILTIN_PARAMETERS[parameter_name] = fallback_value
             return fallback_value, ""
         if fallback_message:
             LOGGER.debug(
@@ -339,7 +367,14 @@ def try_resolve_builtin_parameter(parameter_name):
     return None, message
 
 
-def try_get_element_parameter(element, parameter_name):
+def try_get_element_parameter(element, parameter_name, parameter_cache=None):
+    """Получить параметр элемента по имени BuiltInParameter.
+
+    ``parameter_cache`` — необязательный словарь ``{BuiltInParameter:
+    Parameter}`` одного элемента. Найденные параметры (и их отсутствие)
+    запоминаются в нём, чтобы не вызывать get_Parameter повторно.
+    """
+
     built_in_parameter, message = try_resolve_builtin_parameter(parameter_name)
     if message:
         return None, message
@@ -347,17 +382,22 @@ def try_get_element_parameter(element, parameter_name):
     if element is None:
         return None, "элемент отсутствует для BuiltInParameter.{0}".format(parameter_name)
 
-    try:
-        parameter = element.get_Parameter(built_in_parameter)
-    except Exception as error:  # noqa: BLE001
-        element_id = getattr(element, "Id", None)
-        LOGGER.debug(
-            "Не удалось получить параметр %s у элемента %s: %s",
-            parameter_name,
-            format_element_id(element_id) if element_id is not None else "<неизвестно>",
-            error,
-        )
-        return None, "ошибка доступа к BuiltInParameter.{0}: {1}".format(parameter_name, error)
+    if parameter_cache is not None and built_in_parameter in parameter_cache:
+        parameter = parameter_cache[built_in_parameter]
+    else:
+        try:
+            parameter = element.get_Parameter(built_in_parameter)
+        except Exception as error:  # noqa: BLE001
+            element_id = getattr(element, "Id", None)
+            LOGGER.debug(
+                "Не удалось получить параметр %s у элемента %s: %s",
+                parameter_name,
+                format_element_id(element_id) if element_id is not None else "<неизвестно>",
+                error,
+            )
+            return None, "ошибка доступа к BuiltInParameter.{0}: {1}".format(parameter_name, error)
+        if parameter_cache is not None:
+            parameter_cache[built_in_parameter] = parameter
 
     if parameter is None:
         return None, "элемент не содержит BuiltInParameter.{0}".format(parameter_name)
@@ -365,8 +405,8 @@ def try_get_element_parameter(element, parameter_name):
     return parameter, ""
 
 
-def try_get_parameter_value(element, parameter_name, extractor, description=None):
-    parameter, message = try_get_element_parameter(element, parameter_name)
+def try_get_parameter_value(element, parameter_name, extractor, description=None, parameter_cache=None):
+    parameter, message = try_get_element_parameter(element, parameter_name, parameter_cache)
     if message:
         return None, message
 
@@ -383,6 +423,23 @@ def try_get_parameter_value(element, parameter_name, extractor, description=None
         return None, "не удалось прочитать BuiltInParameter.{0}: {1}".format(parameter_name, error)
 
 
+def _collect_wall_params(wall, builtins, collected=None):
+    """Собрать параметры стены в словарь ``{BuiltInParameter: Parameter}``.
+
+    Каждый параметр из ``builtins`` запрашивается не более одного раза:
+    уже присутствующие в ``collected`` ключи повторно не читаются.
+    Отсутствующие у стены параметры сохраняются как ``None``.
+    """
+
+    if collected is None:
+        collected = {}
+    get_parameter = wall.get_Parameter
+    for built_in_parameter in builtins:
+        if built_in_parameter not in collected:
+            collected[built_in_parameter] = get_parameter(built_in_parameter)
+    return collected
+
+
 def safe_get_name(entity):
     """Безопасно получить свойство Name у объектов Revit API."""
 
@@ -430,18 +487,131 @@ class WallLocationReference(enum.IntEnum):
     CORE_FACE_INTERIOR = 5
 
 
+# Значения WALL_KEY_REF_PARAM идут подряд с нуля, поэтому целое из
+# AsInteger() используется как индекс без вызова конструктора перечисления.
+_LOC_REF_BY_INT = tuple(WallLocationReference)
+
+
+class WallSnapshot(object):
+    """Данные исходной стены, прочитанные из Revit API один раз перед разбиением.
+
+    Вспомогательные методы получают значения из снимка и не обращаются
+    повторно к исходной стене для каждого слоя.
+    """
+
+    def __init__(
+        self,
+        base_curve,
+        orientation,
+        base_level_id,
+        base_offset,
+        top_constraint_id,
+        top_offset,
+        unconnected_height,
+        flipped,
+        is_structural,
+        location_line,
+        layers,
+    ):
+        self.base_curve = base_curve
+        self.orientation = orientation
+        self.base_level_id = base_level_id
+        self.base_offset = base_offset
+        self.top_constraint_id = top_constraint_id
+        self.top_offset = top_offset
+        self.unconnected_height = unconnected_height
+        self.flipped = flipped
+        self.is_structural = is_structural
+        self.location_line = location_line
+        self.layers = tuple(layers)
+        self.layer_widths = tuple(layer.Width for layer in self.layers)
+        self.layer_center_offsets = ()
+
+
 class LayerWallInfo(object):
-    def __init__(self, wall, layer, index, center_offset):
+    def __init__(self, wall, layer, index, center_offset, width=None):
         self.wall = wall
         self.layer = layer
         self.index = index
         self.center_offset = center_offset
-        self._half_width = layer.Width / 2.0
+        half_width = (layer.Width if width is None else width) / 2.0
+        self.lower_bound = center_offset - half_width
+        self.upper_bound = center_offset + half_width
+
+
+class LayerOffsetTable(object):
+    """Границы слоёв, отсортированные по нижней границе смещения.
+
+    Строится один раз на стену. Слои стены не пересекаются, поэтому для
+    каждого семейства достаточно бинарного поиска по нижним границам и
+    короткого прохода назад, пока верхняя граница ещё покрывает смещение.
+    """
+
+    def __init__(self, layer_infos):
+        infos = list(layer_infos)
+        order = sorted(range(len(infos)), key=lambda position: infos[position].lower_bound)
+        self.infos = [infos[position] for position in order]
+        # Исходные позиции нужны, чтобы при равном расстоянии выбирался тот
+        # же слой, что и при последовательном переборе.
+        self.positions = order
+        self.centers = [info.center_offset for info in self.infos]
+        self.lower_bounds = [info.lower_bound for info in self.infos]
+        self.upper_bounds = [info.upper_bound for info in self.infos]
+
+    def find(self, offset, tolerance):
+        """Вернуть слой, содержащий смещение и ближайший к нему по центру."""
+
+        best_index = -1
+        best_key = None
+        index = bisect.bisect_right(self.lower_bounds, offset + 2.0 * tolerance)
+        while index > 0:
+            index -= 1
+            if self.upper_bounds[index] + tolerance < offset:
+                break
+            if self.lower_bounds[index] - tolerance > offset:
+                continue
+            key = (abs(self.centers[index] - offset), self.positions[index])
+            if best_key is None or key < best_key:
+                best_index = index
+                best_key = key
+        if best_index < 0:
+            return None
+        return self.infos[best_index]
 
-    def contains_offset(self, offset, tolerance):
-        return (self.center_offset - self._half_width - tolerance) <= offset <= (
-            self.center_offset + self._half_width + tolerance
-        )
+
+class DocumentState(object):
+    """Свойства документа, которые не меняются в пределах одной транзакции.
+
+    Снимок берётся один раз после начала транзакции и используется
+    проверками всех стен пакета вместо повторных обращений к документу.
+    """
+
+    def __init__(self, document):
+        self.is_modifiable = document.IsModifiable
+        self.is_workshared = document.IsWorkshared
+        try:
+            self.active_option_id = document.ActiveDesignOptionId
+        except (AttributeError, InvalidOperationException):
+            # Свойство ActiveDesignOptionId появилось в API Revit сравнительно недавно,
+            # поэтому на старых версиях приложения его может не быть. В этом случае,
+            # а также если Revit запрещает читать активную дизайн-опцию, считаем,
+            # что активной опции нет (ElementId.InvalidElementId).
+            self.active_option_id = ElementId.InvalidElementId
+        self.active_phase_id, self.active_phase_message = try_get_active_view_phase_id(document)
+        self.username = get_document_username(document) if self.is_workshared else ""
+        self.is_owned_by_another_user = build_ownership_checker(self.username)
+
+
+class DetachedFamilyInstances(object):
+    """Семейства, временно отвязанные от исходной стены."""
+
+    def __init__(self, instances, failed_ids):
+        self.instances = instances
+        self.failed_ids = failed_ids
+        self.committed = False
+
+    def commit(self):
+        self.committed = True
 
 
 class WallSplitResult(object):
@@ -467,8 +637,17 @@ class WallSplitResult(object):
 
 
 class WallSelectionFilter(ISelectionFilter):
+    def __init__(self, multi_layer_type_ids=None):
+        # Набор ID многослойных типов стен строится заранее, чтобы при
+        # наведении курсора не запрашивать CompoundStructure у каждого элемента.
+        self._multi_layer_type_ids = multi_layer_type_ids
+
     def AllowElement(self, element):  # noqa: N802
-        return isinstance(element, Wall) and has_multiple_layers(element)
+        if not isinstance(element, Wall):
+            return False
+        if self._multi_layer_type_ids is None:
+            return has_multiple_layers(element)
+        return element.GetTypeId().IntegerValue in self._multi_layer_type_ids
 
     def AllowReference(self, reference, position):  # noqa: N802
         return False
@@ -497,8 +676,21 @@ class WallLayerSplitterCommand(object):
         self.doc = document
         self.layer_type_cache = {}
         self.skip_messages = []
-        self.diagnostic_log = []
-        self.wall_type_name_map = None
+        self._skip_message_set = set()
+        self.diagnostic_log = collections.deque(maxlen=MAX_DIAGNOSTIC_LOG_LENGTH)
+        self.wall_type_name_map = {}
+        self._wall_type_cache = {}
+        self._structure_cache = {}
+        self._core_index_cache = {}
+        self._fi_filter = None
+        self._hosted_instance_map = None
+        self._base_name_cache = {}
+        self._material_name_cache = {}
+        self._element_description_cache = {}
+        self._named_description_cache = {}
+        self._owner_map = {}
+        self._missing_target_parameters = set()
+        self._document_state = None
 
     def execute(self):
         if not REVIT_API_AVAILABLE:
@@ -518,7 +710,17 @@ class WallLayerSplitterCommand(object):
 
         LOGGER.info("Запуск команды WallLayerSplitter.")
         self.skip_messages = []
-        self.diagnostic_log = []
+        self._skip_message_set = set()
+        self.diagnostic_log = collections.deque(maxlen=MAX_DIAGNOSTIC_LOG_LENGTH)
+        self._wall_type_cache = {}
+        self._structure_cache = {}
+        self._core_index_cache = {}
+        self._material_name_cache = {}
+        self._element_description_cache = {}
+        self._named_description_cache = {}
+        self._owner_map = {}
+        self._missing_target_parameters = set()
+        self._document_state = None
         self.log_diagnostic("Команда запущена.")
 
         target_walls = list(self.collect_target_walls(ui_doc))
@@ -529,7 +731,7 @@ class WallLayerSplitterCommand(object):
             return
 
         LOGGER.info("Найдено %s стен(ы) для обработки.", len(target_walls))
-        self.log_diagnostic("Найдено для обработки стен: {0}.".format(len(target_walls)))
+        self.log_diagnostic("Найдено для обработки стен: {0}.", len(target_walls))
 
         split_results = []
 
@@ -538,14 +740,31 @@ class WallLayerSplitterCommand(object):
             tgroup.Start()
             LOGGER.debug("TransactionGroup начата.")
 
+            # Индекс имён типов строится один раз на запуск: дальнейший поиск
+            # по имени выполняется через словарь, а новые типы добавляются в
+            # него в register_wall_type.
+            self.wall_type_name_map = self.build_wall_type_name_map()
+            LOGGER.debug("Индекс типов стен построен: %s имён.", len(self.wall_type_name_map))
+
+            self._fi_filter = ElementClassFilter(FamilyInstance)
+            self._hosted_instance_map = None
+            if len(target_walls) > 1:
+                self._hosted_instance_map = self.build_hosted_instance_map(target_walls)
+
+            # Все стены выборки обрабатываются в одной транзакции: время работы
+            # определяется числом обращений к Revit API, а не вычислениями, и
+            # отдельная транзакция на стену лишь добавила бы фиксаций и
+            # регенераций. Ошибка любой стены откатывает всю группу целиком.
             transaction = Transaction(self.doc, "Создание стен по слоям")
             try:
                 transaction.Start()
                 LOGGER.debug("Transaction начата.")
+                self._document_state = DocumentState(self.doc)
+                self._owner_map = get_owners_bulk(self.doc, [wall.Id for wall in target_walls])
 
                 for wall in target_walls:
                     wall_id = wall.Id.IntegerValue
-                    base_type = try_get_wall_type(self.doc, wall)
+                    base_type = self.get_wall_type(wall)
                     if base_type is None:
                         LOGGER.info(
                             "Стена %s пропущена: не удалось получить тип стены.", wall_id
@@ -557,9 +776,7 @@ class WallLayerSplitterCommand(object):
 
                     wall_type_name = getattr(base_type, "Name", None) or "<без типа>"
                     LOGGER.info("Обработка стены %s (тип '%s').", wall_id, wall_type_name)
-                    self.log_diagnostic(
-                        "Стена {0}: начало обработки (тип \"{1}\").".format(wall_id, wall_type_name)
-                    )
+                    self.log_diagnostic("Стена {0}: начало обработки (тип \"{1}\").", wall_id, wall_type_name)
                     if not self.is_wall_type_accepted(base_type):
                         LOGGER.info("Стена %s пропущена фильтром типов.", wall_id)
                         continue
@@ -569,13 +786,13 @@ class WallLayerSplitterCommand(object):
                         split_results.append(result)
                         LOGGER.info("Стена %s успешно разделена.", wall_id)
                         self.log_diagnostic(
-                            "Стена {0}: разделение завершено, создано стен {1}.".format(
-                                wall_id, len(result.created_wall_ids)
-                            )
+                            "Стена {0}: разделение завершено, создано стен {1}.",
+                            wall_id,
+                            len(result.created_wall_ids),
                         )
                     else:
                         LOGGER.info("Стена %s не была разделена.", wall_id)
-                        self.log_diagnostic("Стена {0}: разделение не выполнено.".format(wall_id))
+                        self.log_diagnostic("Стена {0}: разделение не выполнено.", wall_id)
 
                 if not split_results:
                     skip_details = self.build_skip_details(self.skip_messages)
@@ -599,6 +816,8 @@ class WallLayerSplitterCommand(object):
             finally:
                 if transaction.HasStarted():
                     transaction.RollBack()
+                # Снимок действителен только внутри транзакции.
+                self._document_state = None
 
             tgroup.Assimilate()
             LOGGER.debug("TransactionGroup зафиксирована.")
@@ -623,20 +842,19 @@ class WallLayerSplitterCommand(object):
         walls = []
 
         if selected_ids:
-            self.log_diagnostic(
-                "Выбрано заранее элементов: {0}. Фильтрация стен.".format(len(selected_ids))
-            )
+            self.log_diagnostic("Выбрано заранее элементов: {0}. Фильтрация стен.", len(selected_ids))
             for element_id in selected_ids:
                 element = document.GetElement(element_id)
-                if isinstance(element, Wall) and has_multiple_layers(element):
+                if self.is_multi_layer_wall(element, document):
                     walls.append(element)
 
         if walls:
-            self.log_diagnostic("Использована предварительная выборка стен: {0}.".format(len(walls)))
+            self.log_diagnostic("Использована предварительная выборка стен: {0}.", len(walls))
             return walls
 
+        selection_filter = WallSelectionFilter(self.collect_multi_layer_type_ids(document))
         try:
-            picked_refs = selection.PickObjects(ObjectType.Element, WallSelectionFilter(), "Выберите стены для разделения")
+            picked_refs = selection.PickObjects(ObjectType.Element, selection_filter, "Выберите стены для разделения")
         except OperationCanceledException:
             LOGGER.info("Выбор объектов отменён пользователем.")
             self.log_diagnostic("Пользователь отменил выбор стен.")
@@ -644,16 +862,105 @@ class WallLayerSplitterCommand(object):
 
         for reference in picked_refs:
             element = document.GetElement(reference.ElementId)
-            if isinstance(element, Wall) and has_multiple_layers(element):
+            if self.is_multi_layer_wall(element, document):
                 walls.append(element)
 
         if walls:
-            self.log_diagnostic("Выбрано стен после запроса: {0}.".format(len(walls)))
+            self.log_diagnostic("Выбрано стен после запроса: {0}.", len(walls))
         return walls
 
+    def collect_multi_layer_type_ids(self, document):
+        multi_layer_type_ids = set()
+        for wall_type in FilteredElementCollector(document).OfClass(WallType).ToElements():
+            _, layer_count = self.get_compound_structure(wall_type)
+            if layer_count > 1:
+                multi_layer_type_ids.add(wall_type.Id.IntegerValue)
+        return multi_layer_type_ids
+
+    def build_hosted_instance_map(self, walls):
+        """Сгруппировать ID семейств по ID стен-основ одним проходом по документу.
+
+        Используется при обработке нескольких стен вместо отдельного вызова
+        ``GetDependentElements`` для каждой из них.
+        """
+
+        wall_ids = set(wall.Id.IntegerValue for wall in walls)
+        hosted_map = dict((wall_id, []) for wall_id in wall_ids)
+        for family_instance in FilteredElementCollector(self.doc).OfClass(FamilyInstance).ToElements():
+            host = family_instance.Host
+            host_id = host.Id.IntegerValue if host is not None else None
+            if host_id not in wall_ids:
+                host_face = family_instance.HostFace
+                host_id = host_face.ElementId.IntegerValue if host_face is not None else None
+            if host_id in wall_ids:
+                hosted_map[host_id].append(family_instance.Id)
+        self.log_diagnostic("Предварительно собраны семейства для стен: {0}.", len(wall_ids))
+        return hosted_map
+
+    def get_hosted_family_ids(self, wall):
+        """Вернуть пару ``(ID семейств, источник)`` для стены."""
+
+        if self._hosted_instance_map is not None:
+            hosted_ids = self._hosted_instance_map.get(wall.Id.IntegerValue)
+            if hosted_ids is not None:
+                return hosted_ids, HOSTED_IDS_FROM_HOST_MAP
+        if self._fi_filter is None:
+            self._fi_filter = ElementClassFilter(FamilyInstance)
+        return wall.GetDependentElements(self._fi_filter), HOSTED_IDS_FROM_DEPENDENTS
+
     def is_wall_type_accepted(self, wall_type):
         return wall_type is not None
 
+    def get_wall_type(self, wall, document=None):
+        """Получить тип стены с кешированием по ID стены."""
+
+        if wall is None:
+            return None
+        wall_key = wall.Id.IntegerValue
+        wall_type = self._wall_type_cache.get(wall_key)
+        if wall_type is None:
+            wall_type = try_get_wall_type(document if document is not None else self.doc, wall)
+            if wall_type is not None:
+                self._wall_type_cache[wall_key] = wall_type
+        return wall_type
+
+    def get_compound_structure(self, wall_type):
+        """Вернуть пару (CompoundStructure, LayerCount) с кешированием по ID типа.
+
+        Кешированная структура используется только для чтения; для изменения
+        слоёв нужно запрашивать новую копию через ``GetCompoundStructure``.
+        """
+
+        if wall_type is None:
+            return None, 0
+        type_key = wall_type.Id.IntegerValue
+        cached = self._structure_cache.get(type_key)
+        if cached is not None:
+            return cached
+        try:
+            structure = wall_type.GetCompoundStructure()
+        except Exception:  # noqa: BLE001
+            return None, 0
+        cached = (structure, structure.LayerCount if structure else 0)
+        self._structure_cache[type_key] = cached
+        return cached
+
+    def wall_has_multiple_layers(self, wall, document=None):
+        _, layer_count = self.get_compound_structure(self.get_wall_type(wall, document))
+        return layer_count > 1
+
+    def is_multi_layer_wall(self, element, document):
+        # Документ передаётся явно: не нужно читать element.Document, а
+        # элементы, не являющиеся стенами, отсекаются до обращения к типу.
+        if not isinstance(element, Wall):
+            return False
+        return self.wall_has_multiple_layers(element, document)
+
+    def invalidate_wall_type(self, wall_type):
+        if wall_type is None:
+            return
+        self._structure_cache.pop(wall_type.Id.IntegerValue, None)
+
     def split_wall(self, wall):
         if wall is None:
             LOGGER.debug("SplitWall: передана пустая стена.")
@@ -662,9 +969,9 @@ class WallLayerSplitterCommand(object):
         original_wall_id = wall.Id
         wall_id_value = get_element_id_value(original_wall_id)
         wall_label = format_element_id(original_wall_id, wall_id_value)
-        self.log_diagnostic("Стена {0}: сбор исходных данных.".format(wall_label))
+        self.log_diagnostic("Стена {0}: сбор исходных данных.", wall_label)
 
-        base_type = try_get_wall_type(self.doc, wall)
+        base_type = self.get_wall_type(wall)
         if base_type is None:
             LOGGER.debug(
                 "SplitWall: стена %s пропущена — не удалось получить тип стены.",
@@ -674,224 +981,166 @@ class WallLayerSplitterCommand(object):
                 original_wall_id,
                 "не удалось определить тип стены (ошибка доступа к типу)",
             )
-            self.log_diagnostic(
-                "Стена {0}: пропущена — не удалось получить тип стены.".format(
-                    wall_label
-                )
-            )
+            self.log_diagnostic("Стена {0}: пропущена — не удалось получить тип стены.", wall_label)
             return None
 
-        structure = base_type.GetCompoundStructure() if base_type else None
-        if not structure or structure.LayerCount <= 1:
+        structure, layer_count = self.get_compound_structure(base_type)
+        if not structure or layer_count <= 1:
             LOGGER.debug(
                 "SplitWall: стена %s пропущена — состав конструкции отсутствует или один слой.",
                 wall_label,
             )
-            self.log_diagnostic(
-                "Стена {0}: пропущена — нет составной конструкции или один слой.".format(wall_label)
-            )
+            self.log_diagnostic("Стена {0}: пропущена — нет составной конструкции или один слой.", wall_label)
             return None
 
         location = wall.Location
         if not isinstance(location, LocationCurve) or location.Curve is None:
             LOGGER.debug("SplitWall: стена %s не имеет LocationCurve.", wall_label)
-            self.log_diagnostic(
-                "Стена {0}: отсутствует геометрия LocationCurve.".format(wall_label)
-            )
+            self.log_diagnostic("Стена {0}: отсутствует геометрия LocationCurve.", wall_label)
             return None
 
-        hosted_family_ids = wall.GetDependentElements(ElementClassFilter(FamilyInstance))
-        detached_instances, failed_to_detach = self.detach_hosted_family_instances(wall, hosted_family_ids)
+        hosted_family_ids, hosted_ids_source = self.get_hosted_family_ids(wall)
+        with self._detached(wall, hosted_family_ids, hosted_ids_source) as detached:
 
-        detached_id_set = {instance.Id.IntegerValue for instance in detached_instances if instance}
-        can_delete, delete_reason = self.can_delete_original_wall(wall, detached_id_set)
-        if not can_delete:
-            if failed_to_detach:
-                failed_list = ", ".join(str(e.IntegerValue) for e in failed_to_detach)
-                if delete_reason:
-                    delete_reason = "{}; не удалось временно отвязать семейства: {}".format(delete_reason, failed_list)
-                else:
-                    delete_reason = "не удалось временно отвязать семейства: {}".format(failed_list)
-            self.restore_family_instances_to_host(detached_instances, wall)
-            self.report_skip_reason(
-                original_wall_id,
-                "невозможно удалить исходную стену: {}".format(delete_reason),
+            # ID семейств читаются через API один раз и дальше переиспользуются.
+            detached_pairs = [(instance, instance.Id.IntegerValue) for instance in detached.instances if instance]
+            detached_instances = detached.instances = [instance for instance, _ in detached_pairs]
+            detached_id_set = {id_value for _, id_value in detached_pairs}
+            failed_pairs = [(element_id, element_id.IntegerValue) for element_id in detached.failed_ids]
+
+            # Параметры исходной стены читаются из Revit один раз и
+            # переиспользуются проверками, снимком и копированием значений.
+            source_parameters = {}
+            can_delete, delete_reason = self.can_delete_original_wall(
+                wall, detached_id_set, source_parameters
             )
-            self.log_diagnostic(
-                "Стена {0}: невозможно удалить исходную стену ({1}).".format(
-                    wall_label,
-                    delete_reason or "неизвестная причина",
+            if not can_delete:
+                if failed_pairs:
+                    failed_list = ", ".join(str(id_value) for _, id_value in failed_pairs)
+                    if delete_reason:
+                        delete_reason = "{}; не удалось временно отвязать семейства: {}".format(delete_reason, failed_list)
+                    else:
+                        delete_reason = "не удалось временно отвязать семейства: {}".format(failed_list)
+                self.report_skip_reason(
+                    original_wall_id,
+                    "невозможно удалить исходную стену: {}".format(delete_reason),
                 )
-            )
-            return None
-
-        base_curve = location.Curve
-        orientation = wall.Orientation
-        if orientation is None or orientation.GetLength() < 1e-9:
-            orientation = XYZ.BasisY
-        else:
-            orientation = orientation.Normalize()
-
-        base_level_id, base_level_message = try_get_parameter_value(
-            wall,
-            "WALL_BASE_CONSTRAINT",
-            lambda param: param.AsElementId(),
-            "уровень основания стены",
-        )
-        if base_level_message:
-            self.restore_family_instances_to_host(detached_instances, wall)
-            skip_reason = "не удалось получить уровень основания: {0}".format(base_level_message)
-            self.report_skip_reason(original_wall_id, skip_reason)
-            self.log_diagnostic(
-                "Стена {0}: {1}.".format(
+                self.log_diagnostic(
+                    "Стена {0}: невозможно удалить исходную стену ({1}).",
                     wall_label,
-                    skip_reason,
+                    delete_reason or "неизвестная причина",
                 )
-            )
-            return None
+                return None
 
-        base_offset, base_offset_message = try_get_parameter_value(
-            wall,
-            "WALL_BASE_OFFSET",
-            lambda param: param.AsDouble(),
-            "смещение основания стены",
-        )
-        if base_offset_message:
-            self.restore_family_instances_to_host(detached_instances, wall)
-            skip_reason = "не удалось получить смещение основания: {0}".format(base_offset_message)
-            self.report_skip_reason(original_wall_id, skip_reason)
-            self.log_diagnostic(
-                "Стена {0}: {1}.".format(
-                    wall_label,
-                    skip_reason,
-                )
+            base_curve = location.Curve
+            orientation = wall.Orientation
+            if orientation is None or orientation.GetLength() < 1e-9:
+                orientation = XYZ.BasisY
+            else:
+                orientation = orientation.Normalize()
+
+            base_level_id, base_level_message = try_get_parameter_value(
+                wall,
+                "WALL_BASE_CONSTRAINT",
+                lambda param: param.AsElementId(),
+                "уровень основания стены",
+                source_parameters,
             )
-            return None
+            if base_level_message:
+                skip_reason = "не удалось получить уровень основания: {0}".format(base_level_message)
+                self.report_skip_reason(original_wall_id, skip_reason)
+                self.log_diagnostic("Стена {0}: {1}.", wall_label, skip_reason)
+                return None
 
-        top_constraint_id, top_constraint_message = try_get_parameter_value(
-            wall,
-            "WALL_HEIGHT_TYPE",
-            lambda param: param.AsElementId(),
-            "верхнее ограничение стены",
-        )
-        if top_constraint_message:
-            self.restore_family_instances_to_host(detached_instances, wall)
-            skip_reason = "не удалось получить верхнее ограничение: {0}".format(top_constraint_message)
-            self.report_skip_reason(original_wall_id, skip_reason)
-            self.log_diagnostic(
-                "Стена {0}: {1}.".format(
-                    wall_label,
-                    skip_reason,
-                )
+            base_offset, base_offset_message = try_get_parameter_value(
+                wall,
+                "WALL_BASE_OFFSET",
+                lambda param: param.AsDouble(),
+                "смещение основания стены",
+                source_parameters,
             )
-            return None
+            if base_offset_message:
+                skip_reason = "не удалось получить смещение основания: {0}".format(base_offset_message)
+                self.report_skip_reason(original_wall_id, skip_reason)
+                self.log_diagnostic("Стена {0}: {1}.", wall_label, skip_reason)
+                return None
 
-        top_offset, top_offset_message = try_get_parameter_value(
-            wall,
-            "WALL_TOP_OFFSET",
-            lambda param: param.AsDouble(),
-            "смещение верхнего ограничения",
-        )
-        if top_offset_message:
-            self.restore_family_instances_to_host(detached_instances, wall)
-            skip_reason = "не удалось получить смещение верха: {0}".format(top_offset_message)
-            self.report_skip_reason(original_wall_id, skip_reason)
-            self.log_diagnostic(
-                "Стена {0}: {1}.".format(
-                    wall_label,
-                    skip_reason,
-                )
+            top_constraint_id, top_constraint_message = try_get_parameter_value(
+                wall,
+                "WALL_HEIGHT_TYPE",
+                lambda param: param.AsElementId(),
+                "верхнее ограничение стены",
+                source_parameters,
             )
-            return None
+            if top_constraint_message:
+                skip_reason = "не удалось получить верхнее ограничение: {0}".format(top_constraint_message)
+                self.report_skip_reason(original_wall_id, skip_reason)
+                self.log_diagnostic("Стена {0}: {1}.", wall_label, skip_reason)
+                return None
 
-        unconnected_height, unconnected_height_message = try_get_parameter_value(
-            wall,
-            "WALL_USER_HEIGHT_PARAM",
-            lambda param: param.AsDouble(),
-            "высоту несвязанной стены",
-        )
-        if unconnected_height_message:
-            self.restore_family_instances_to_host(detached_instances, wall)
-            skip_reason = "не удалось получить высоту несвязанной стены: {0}".format(
-                unconnected_height_message
-            )
-            self.report_skip_reason(original_wall_id, skip_reason)
-            self.log_diagnostic(
-                "Стена {0}: {1}.".format(
-                    wall_label,
-                    skip_reason,
-                )
+            top_offset, top_offset_message = try_get_parameter_value(
+                wall,
+                "WALL_TOP_OFFSET",
+                lambda param: param.AsDouble(),
+                "смещение верхнего ограничения",
+                source_parameters,
             )
-            return None
+            if top_offset_message:
+                skip_reason = "не удалось получить смещение верха: {0}".format(top_offset_message)
+                self.report_skip_reason(original_wall_id, skip_reason)
+                self.log_diagnostic("Стена {0}: {1}.", wall_label, skip_reason)
+                return None
 
-        is_structural_value, is_structural_message = try_get_parameter_value(
-            wall,
-            "WALL_STRUCTURAL_SIGNIFICANT",
-            lambda param: param.AsInteger(),
-            "флаг несущей стены",
-        )
-        if is_structural_message:
-            self.restore_family_instances_to_host(detached_instances, wall)
-            skip_reason = "не удалось получить признак несущей стены: {0}".format(
-                is_structural_message
+            unconnected_height, unconnected_height_message = try_get_parameter_value(
+                wall,
+                "WALL_USER_HEIGHT_PARAM",
+                lambda param: param.AsDouble(),
+                "высоту несвязанной стены",
+                source_parameters,
             )
-            self.report_skip_reason(original_wall_id, skip_reason)
-            self.log_diagnostic(
-                "Стена {0}: {1}.".format(
-                    wall_label,
-                    skip_reason,
+            if unconnected_height_message:
+                skip_reason = "не удалось получить высоту несвязанной стены: {0}".format(
+                    unconnected_height_message
                 )
-            )
-            return None
-        is_structural = is_structural_value == 1
+                self.report_skip_reason(original_wall_id, skip_reason)
+                self.log_diagnostic("Стена {0}: {1}.", wall_label, skip_reason)
+                return None
 
-        location_line_value, location_line_message = try_get_parameter_value(
-            wall,
-            "WALL_KEY_REF_PARAM",
-            lambda param: param.AsInteger(),
-            "привязку Location Line",
-        )
-        if location_line_message:
-            self.restore_family_instances_to_host(detached_instances, wall)
-            skip_reason = "не удалось получить привязку Location Line: {0}".format(
-                location_line_message
+            is_structural_value, is_structural_message = try_get_parameter_value(
+                wall,
+                "WALL_STRUCTURAL_SIGNIFICANT",
+                lambda param: param.AsInteger(),
+                "флаг несущей стены",
+                source_parameters,
             )
-            self.report_skip_reason(original_wall_id, skip_reason)
-            self.log_diagnostic(
-                "Стена {0}: {1}.".format(
-                    wall_label,
-                    skip_reason,
+            if is_structural_message:
+                skip_reason = "не удалось получить признак несущей стены: {0}".format(
+                    is_structural_message
                 )
+                self.report_skip_reason(original_wall_id, skip_reason)
+                self.log_diagnostic("Стена {0}: {1}.", wall_label, skip_reason)
+                return None
+            is_structural = is_structural_value == 1
+
+            location_line_value, location_line_message = try_get_parameter_value(
+                wall,
+                "WALL_KEY_REF_PARAM",
+                lambda param: param.AsInteger(),
+                "привязку Location Line",
+                source_parameters,
             )
-            return None
-        location_line = location_line_value
-
-        layers = structure.GetLayers()
-        wall_location_line = self.resolve_wall_location_line(location_line)
-        total_thickness = self.calculate_total_thickness(layers)
-        exterior_face_offset = total_thickness / 2.0
-        reference_offset = self.calculate_reference_offset(structure, layers, wall_location_line, exterior_face_offset)
-
-        created_walls = []
-        layer_infos = []
-
-        for index, layer in enumerate(layers):
-            if layer.Width <= 0:
-                continue
-
-            layer_type = self.get_or_create_layer_type(base_type, layer, index)
-            self.log_diagnostic(
-                "Стена {0}: обработка слоя {1}, толщина {2:.3f}.".format(
-                    wall_label, index + 1, layer.Width
+            if location_line_message:
+                skip_reason = "не удалось получить привязку Location Line: {0}".format(
+                    location_line_message
                 )
-            )
-            layer_center_offset = self.calculate_layer_center_offset(layers, index, exterior_face_offset)
-            layer_offset_from_reference = reference_offset + layer_center_offset
-            offset_curve = self.create_offset_curve(base_curve, orientation, layer_offset_from_reference)
+                self.report_skip_reason(original_wall_id, skip_reason)
+                self.log_diagnostic("Стена {0}: {1}.", wall_label, skip_reason)
+                return None
+            location_line = location_line_value
 
-            new_wall = self.create_wall_from_layer(
-                offset_curve,
-                layer_type,
+            snapshot = WallSnapshot(
+                base_curve,
+                orientation,
                 base_level_id,
                 base_offset,
                 top_constraint_id,
@@ -900,48 +1149,80 @@ class WallLayerSplitterCommand(object):
                 wall.Flipped,
                 is_structural,
                 location_line,
+                structure.GetLayers(),
+            )
+            layers = snapshot.layers
+            layer_widths = snapshot.layer_widths
+            wall_location_line = self.resolve_wall_location_line(location_line)
+            cumulative_widths = self.compute_cumulative_widths(layer_widths)
+            total_thickness = cumulative_widths[-1]
+            exterior_face_offset = total_thickness / 2.0
+            reference_offset = self.calculate_reference_offset(structure, layers, wall_location_line, exterior_face_offset)
+            snapshot.layer_center_offsets = self.calculate_layer_center_offsets(
+                layer_widths, exterior_face_offset, cumulative_widths
             )
 
-            self.copy_instance_parameters(wall, new_wall)
-            created_walls.append(new_wall.Id)
-            layer_infos.append(LayerWallInfo(new_wall, layer, index, layer_offset_from_reference))
+            created_walls = []
+            layer_infos = []
+            parameter_snapshot = self.snapshot_instance_parameters(wall, source_parameters)
 
-        if not created_walls:
-            TaskDialog.Show(
-                "Разделение слоев стен",
-                "Не удалось создать новые стены для исходной стены {}.".format(wall_label),
-            )
-            self.restore_family_instances_to_host(detached_instances, wall)
-            self.log_diagnostic("Стена {0}: новые стены не созданы.".format(wall_label))
-            return None
+            for index, layer in enumerate(layers):
+                layer_width = layer_widths[index]
+                if layer_width <= 0:
+                    continue
 
-        try:
-            self.log_diagnostic("Стена {0}: удаление исходной стены.".format(wall_label))
-            self.doc.Delete(original_wall_id)
-        except InvalidOperationException as ex:
-            self.restore_family_instances_to_host(detached_instances, wall)
-            raise InvalidOperationException(
-                "Не удалось удалить исходную стену (ID: {}). Подробности: {}".format(
-                    wall_label,
-                    ex.Message,
+                layer_type = self.get_or_create_layer_type(base_type, layer, index)
+                self.log_diagnostic("Стена {0}: обработка слоя {1}, толщина {2:.3f}.", wall_label, index + 1, layer_width)
+                layer_offset_from_reference = reference_offset + snapshot.layer_center_offsets[index]
+                if math.fabs(layer_offset_from_reference) < _ZERO_OFFSET_EPS:
+                    offset_curve = base_curve
+                else:
+                    offset_curve = self.create_offset_curve(base_curve, orientation, layer_offset_from_reference)
+
+                parameter_cache = {}
+                new_wall = self.create_wall_from_layer(offset_curve, layer_type, snapshot, parameter_cache)
+
+                self.copy_instance_parameters(parameter_snapshot, new_wall, parameter_cache)
+                created_walls.append(new_wall.Id)
+                layer_infos.append(
+                    LayerWallInfo(new_wall, layer, index, layer_offset_from_reference, layer_width)
                 )
-            )
-        except ArgumentException as ex:
-            self.restore_family_instances_to_host(detached_instances, wall)
-            raise InvalidOperationException(
-                "Не удалось удалить исходную стену (ID: {}). Подробности: {}".format(
-                    wall_label,
-                    ex.Message,
+
+            if not created_walls:
+                TaskDialog.Show(
+                    "Разделение слоев стен",
+                    "Не удалось создать новые стены для исходной стены {}.".format(wall_label),
                 )
-            )
-        except Exception as ex:  # noqa: BLE001
-            self.restore_family_instances_to_host(detached_instances, wall)
-            raise InvalidOperationException(
-                "Не удалось удалить исходную стену (ID: {}). Подробности: {}".format(
-                    wall_label,
-                    ex,
+                self.log_diagnostic("Стена {0}: новые стены не созданы.", wall_label)
+                return None
+
+            try:
+                self.log_diagnostic("Стена {0}: удаление исходной стены.", wall_label)
+                self.doc.Delete(original_wall_id)
+            except InvalidOperationException as ex:
+                raise InvalidOperationException(
+                    "Не удалось удалить исходную стену (ID: {}). Подробности: {}".format(
+                        wall_label,
+                        ex.Message,
+                    )
+                )
+            except ArgumentException as ex:
+                raise InvalidOperationException(
+                    "Не удалось удалить исходную стену (ID: {}). Подробности: {}".format(
+                        wall_label,
+                        ex.Message,
+                    )
+                )
+            except Exception as ex:  # noqa: BLE001
+                raise InvalidOperationException(
+                    "Не удалось удалить исходную стену (ID: {}). Подробности: {}".format(
+                        wall_label,
+                        ex,
+                    )
                 )
-            )
+
+            # Исходная стена удалена — возвращать семейства больше некуда.
+            detached.commit()
 
         rehosted_instances, unmatched_instances = self.rehost_family_instances(
             base_curve,
@@ -955,47 +1236,29 @@ class WallLayerSplitterCommand(object):
             created_walls,
             rehosted_instances,
             unmatched_instances,
-            [element_id for element_id in failed_to_detach] if failed_to_detach else [],
+            [element_id for element_id, _ in failed_pairs],
             wall_id_value,
         )
 
         return result
 
     def get_or_create_layer_type(self, base_type, layer, index):
-        base_type_name = base_type.Name if isinstance(base_type, WallType) else "<без типа>"
-        self.log_diagnostic(
-            "  Слой {0}: поиск или создание типа на основе \"{1}\".".format(
-                index + 1, base_type_name
-            )
-        )
+        # В кеше хранятся сами WallType: типы, созданные или найденные в
+        # рамках запуска, не удаляются до его окончания, поэтому повторный
+        # GetElement для проверки не нужен.
         cache_key = self.build_layer_type_key(base_type.Id, layer, index)
-        cached_id = self.layer_type_cache.get(cache_key)
-        if cached_id:
-            existing = self.doc.GetElement(cached_id)
-            if isinstance(existing, WallType):
-                self.log_diagnostic(
-                    "  Слой {0}: найден кешированный тип (ID {1}).".format(
-                        index + 1, existing.Id.IntegerValue
-                    )
-                )
-                return existing
-            self.layer_type_cache.pop(cache_key, None)
+        cached_type = self.layer_type_cache.get(cache_key)
+        if cached_type is not None:
+            self.log_diagnostic("  Слой {0}: найден кешированный тип (ID {1}).", index + 1, cached_type.Id.IntegerValue)
+            return cached_type
 
+        base_type_name = base_type.Name if isinstance(base_type, WallType) else "<без типа>"
+        self.log_diagnostic("  Слой {0}: поиск или создание типа на основе \"{1}\".", index + 1, base_type_name)
         type_name = self.build_layer_type_name(base_type, layer, index)
-        for candidate in FilteredElementCollector(self.doc).OfClass(WallType).ToElements():
-            if isinstance(candidate, WallType) and candidate.Name.lower() == type_name.lower():
-                self.layer_type_cache[cache_key] = candidate.Id
-                self.log_diagnostic(
-                    "  Слой {0}: найден существующий тип \"{1}\".".format(index + 1, candidate.Name)
-                )
-                return candidate
-
         existing = self.find_wall_type_by_name(type_name)
-        if isinstance(existing, WallType):
-            self.layer_type_cache[cache_key] = existing.Id
-            self.log_diagnostic(
-                "  Слой {0}: использован тип \"{1}\" из словаря.".format(index + 1, existing.Name)
-            )
+        if existing is not None:
+            self.layer_type_cache[cache_key] = existing
+            self.log_diagnostic("  Слой {0}: найден существующий тип \"{1}\".", index + 1, existing.Name)
             return existing
 
         duplicated = self.duplicate_wall_type_with_safe_name(base_type, type_name, index)
@@ -1006,80 +1269,68 @@ class WallLayerSplitterCommand(object):
         new_layers = [CompoundStructureLayer(layer.Width, layer.Function, layer.MaterialId)]
         new_structure.SetLayers(new_layers)
         duplicated.SetCompoundStructure(new_structure)
+        self.invalidate_wall_type(duplicated)
         self.set_structural_material(duplicated, layer.MaterialId)
         self.log_diagnostic(
-            "  Слой {0}: создан новый тип \"{1}\" (ID {2}).".format(
-                index + 1, duplicated.Name, duplicated.Id.IntegerValue
-            )
+            "  Слой {0}: создан новый тип \"{1}\" (ID {2}).",
+            index + 1,
+            duplicated.Name,
+            duplicated.Id.IntegerValue,
         )
 
-        self.layer_type_cache[cache_key] = duplicated.Id
+        self.layer_type_cache[cache_key] = duplicated
         return duplicated
 
     def duplicate_wall_type_with_safe_name(self, base_type, desired_name, layer_index):
         base_name = self.prepare_layer_type_base_name(desired_name)
-        name_map = self.get_wall_type_name_map()
 
-        for attempt in range(1, MAX_LAYER_TYPE_NAME_ATTEMPTS + 1):
-            raw_candidate_name = self.build_candidate_layer_type_name(base_name, attempt)
-            candidate_name = make_valid_wall_type_name(
-                raw_candidate_name,
-                max_length=MAX_LAYER_TYPE_NAME_LENGTH,
-            )
-            name_key = self.normalize_wall_type_name(candidate_name)
-            if name_key in name_map:
-                LOGGER.debug(
-                    "Тип стены с именем '%s' (исходно '%s') уже существует, попытка %s пропущена.",
-                    candidate_name,
-                    raw_candidate_name,
-                    attempt,
-                )
+        attempt = 0
+        while True:
+            free_name = self.find_free_layer_type_name(base_name, attempt + 1)
+            if free_name is None:
+                break
+            next_attempt, candidate_name = free_name
+            if next_attempt > attempt + 1:
                 self.log_diagnostic(
-                    "  Слой {0}: имя \"{1}\" → \"{2}\" уже занято (попытка {3}).".format(
-                        layer_index + 1,
-                        raw_candidate_name,
-                        candidate_name,
-                        attempt,
-                    )
+                    "  Слой {0}: имена для попыток {1}–{2} уже заняты.",
+                    layer_index + 1,
+                    attempt + 1,
+                    next_attempt - 1,
                 )
-                continue
+            attempt = next_attempt
 
             try:
                 self.log_diagnostic(
-                    "  Слой {0}: попытка {1} создать тип \"{2}\" (исходное \"{3}\").".format(
-                        layer_index + 1,
-                        attempt,
-                        candidate_name,
-                        raw_candidate_name,
-                    )
+                    "  Слой {0}: попытка {1} создать тип \"{2}\".",
+                    layer_index + 1,
+                    attempt,
+                    candidate_name,
                 )
                 duplicated = base_type.Duplicate(candidate_name)
 
             except (ArgumentException, InvalidOperationException) as error:
                 LOGGER.warning(
-                    "Не удалось создать тип стены '%s' (исходно '%s', попытка %s): %s",
+                    "Не удалось создать тип стены '%s' (попытка %s): %s",
                     candidate_name,
-                    raw_candidate_name,
                     attempt,
                     error,
                 )
                 self.log_diagnostic(
-                    "  Слой {0}: ошибка при создании типа \"{1}\" (из \"{2}\", попытка {3}) — {4}.".format(
-                        layer_index + 1,
-                        candidate_name,
-                        raw_candidate_name,
-                        attempt,
-                        self.extract_error_message(error),
-                    )
+                    "  Слой {0}: ошибка при создании типа \"{1}\" (попытка {2}) — {3}.",
+                    layer_index + 1,
+                    candidate_name,
+                    attempt,
+                    self.extract_error_message(error),
                 )
                 continue
 
             if isinstance(duplicated, WallType):
                 self.register_wall_type(duplicated)
                 self.log_diagnostic(
-                    "  Слой {0}: успешно создан тип \"{1}\" (ID {2}).".format(
-                        layer_index + 1, duplicated.Name, duplicated.Id.IntegerValue
-                    )
+                    "  Слой {0}: успешно создан тип \"{1}\" (ID {2}).",
+                    layer_index + 1,
+                    duplicated.Name,
+                    duplicated.Id.IntegerValue,
                 )
                 return duplicated
 
@@ -1092,11 +1343,36 @@ class WallLayerSplitterCommand(object):
                 layer_index + 1
             )
         )
-        self.log_diagnostic("  Слой {0}: все попытки исчерпаны без успеха.".format(layer_index + 1))
+        self.log_diagnostic("  Слой {0}: все попытки исчерпаны без успеха.", layer_index + 1)
         raise InvalidOperationException(message)
 
+    def find_free_layer_type_name(self, base_name, start_attempt):
+        """Найти первое свободное имя типа начиная с попытки ``start_attempt``.
+
+        Возвращает кортеж ``(attempt, candidate_name)`` или ``None``, если все
+        попытки до ``MAX_LAYER_TYPE_NAME_ATTEMPTS`` заняты. ``base_name`` уже
+        очищено в ``prepare_layer_type_base_name``, а числовой суффикс не
+        добавляет запрещённых символов, поэтому повторная очистка не нужна.
+        """
+
+        name_map = self.wall_type_name_map
+        for attempt in range(start_attempt, MAX_LAYER_TYPE_NAME_ATTEMPTS + 1):
+            candidate_name = self.build_candidate_layer_type_name(base_name, attempt)
+            if _normalize_wall_type_name(candidate_name) not in name_map:
+                return attempt, candidate_name
+            LOGGER.debug(
+                "Тип стены с именем '%s' уже существует, попытка %s пропущена.",
+                candidate_name,
+                attempt,
+            )
+        return None
+
     def prepare_layer_type_base_name(self, desired_name):
         raw_name = (desired_name or "").strip()
+        base_name = self._base_name_cache.get(raw_name)
+        if base_name is not None:
+            return base_name
+
         base_name = make_valid_wall_type_name(
             raw_name,
             max_length=SAFE_LAYER_TYPE_BASE_NAME_LENGTH,
@@ -1107,53 +1383,76 @@ class WallLayerSplitterCommand(object):
                 raw_name,
                 base_name,
             )
+        self._base_name_cache[raw_name] = base_name
         return base_name
 
     def build_candidate_layer_type_name(self, base_name, attempt):
         if attempt <= 1:
             return base_name
         suffix = " ({})".format(attempt)
+        candidate_name = base_name + suffix
+        if len(candidate_name) <= MAX_LAYER_TYPE_NAME_LENGTH:
+            return candidate_name
         max_base_length = max(1, MAX_LAYER_TYPE_NAME_LENGTH - len(suffix))
         trimmed = base_name[:max_base_length].rstrip()
         if not trimmed:
             trimmed = base_name[:max_base_length]
-        return "{}{}".format(trimmed, suffix)
-
-    def get_wall_type_name_map(self):
-        if self.wall_type_name_map is None:
-            self.wall_type_name_map = {}
-            for candidate in FilteredElementCollector(self.doc).OfClass(WallType):
-                if isinstance(candidate, WallType) and candidate.Name:
-                    name_key = self.normalize_wall_type_name(candidate.Name)
-                    if name_key:
-                        self.wall_type_name_map[name_key] = candidate
-        return self.wall_type_name_map
+        return trimmed + suffix
+
+    def build_wall_type_name_map(self):
+        """Собрать индекс ``{нормализованное имя: WallType}`` одним проходом.
+
+        Коллектор OfClass(WallType) возвращает только типы стен, поэтому
+        дополнительная проверка isinstance для каждого элемента не нужна.
+        """
+
+        name_map = {}
+        normalize = _normalize_wall_type_name
+        for candidate in FilteredElementCollector(self.doc).OfClass(WallType).ToElements():
+            name = candidate.Name
+            if name:
+                name_key = normalize(name)
+                if name_key:
+                    name_map[name_key] = candidate
+        return name_map
 
     def register_wall_type(self, wall_type):
         if not isinstance(wall_type, WallType) or not wall_type.Name:
             return
-        name_key = self.normalize_wall_type_name(wall_type.Name)
+        self.invalidate_wall_type(wall_type)
+        name_key = _normalize_wall_type_name(wall_type.Name)
         if name_key:
-            self.get_wall_type_name_map()[name_key] = wall_type
+            self.wall_type_name_map[name_key] = wall_type
 
     def find_wall_type_by_name(self, type_name):
         if not type_name:
             return None
-        return self.get_wall_type_name_map().get(self.normalize_wall_type_name(type_name))
+        return self.wall_type_name_map.get(_normalize_wall_type_name(type_name))
 
     @staticmethod
-    def normalize_wall_type_name(name):
-        return (name or "").strip().lower()
+    def compute_cumulative_widths(layer_widths):
+        """Префиксные суммы толщин: ``cum[0] = 0``, ``cum[i + 1] = cum[i] + w[i]``.
 
-    @staticmethod
-    def calculate_total_thickness(layers):
-        return sum(layer.Width for layer in layers)
+        Последний элемент равен общей толщине стены.
+        """
+
+        cumulative_widths = [0.0]
+        cumulative = 0.0
+        for width in layer_widths:
+            cumulative += width
+            cumulative_widths.append(cumulative)
+        return cumulative_widths
 
     @staticmethod
-    def calculate_layer_center_offset(layers, layer_index, exterior_face_offset):
-        cumulative = sum(layers[i].Width for i in range(layer_index))
-        center_from_exterior = cumulative + layers[layer_index].Width / 2.0
-        return exterior_face_offset - center_from_exterior
+    def calculate_layer_center_offsets(layer_widths, exterior_face_offset, cumulative_widths=None):
+        """Смещения центров всех слоёв по накопленным суммам толщин."""
+
+        if cumulative_widths is None:
+            cumulative_widths = WallLayerSplitterCommand.compute_cumulative_widths(layer_widths)
+        return [
+            exterior_face_offset - (cumulative_widths[index] + width / 2.0)
+            for index, width in enumerate(layer_widths)
+        ]
 
     def calculate_reference_offset(self, structure, layers, wall_location_line, exterior_face_offset):
         if wall_location_line == WallLocationReference.WALL_CENTERLINE:
@@ -1162,195 +1461,229 @@ class WallLayerSplitterCommand(object):
             return exterior_face_offset
         if wall_location_line == WallLocationReference.FINISH_FACE_INTERIOR:
             return -exterior_face_offset
-        if wall_location_line == WallLocationReference.CORE_FACE_EXTERIOR:
-            return self.calculate_core_face_exterior_offset(structure, layers, exterior_face_offset)
-        if wall_location_line == WallLocationReference.CORE_FACE_INTERIOR:
-            return self.calculate_core_face_interior_offset(structure, layers, exterior_face_offset)
-        if wall_location_line == WallLocationReference.CORE_CENTERLINE:
-            return self.calculate_core_centerline_offset(structure, layers, exterior_face_offset)
-        return 0
-
-    @staticmethod
-    def calculate_core_face_exterior_offset(structure, layers, exterior_face_offset):
-        success, exterior_thickness, _, _ = try_get_core_thicknesses(structure, layers)
-        if not success:
+        if wall_location_line not in (
+            WallLocationReference.CORE_FACE_EXTERIOR,
+            WallLocationReference.CORE_FACE_INTERIOR,
+            WallLocationReference.CORE_CENTERLINE,
+        ):
             return 0
-        return exterior_face_offset - exterior_thickness
 
-    @staticmethod
-    def calculate_core_face_interior_offset(structure, layers, exterior_face_offset):
-        success, _, _, interior_thickness = try_get_core_thicknesses(structure, layers)
-        if not success:
-            return 0
-        return -exterior_face_offset + interior_thickness
-
-    @staticmethod
-    def calculate_core_centerline_offset(structure, layers, exterior_face_offset):
-        success, exterior_thickness, core_thickness, _ = try_get_core_thicknesses(structure, layers)
+        # Толщины зон считаются одним проходом и используются всеми
+        # вариантами привязки к сердцевине.
+        success, exterior_thickness, core_thickness, interior_thickness = try_get_core_thicknesses(
+            structure, layers, self.get_core_layer_indices(structure)
+        )
         if not success:
             return 0
+        if wall_location_line == WallLocationReference.CORE_FACE_EXTERIOR:
+            return exterior_face_offset - exterior_thickness
+        if wall_location_line == WallLocationReference.CORE_FACE_INTERIOR:
+            return -exterior_face_offset + interior_thickness
         return exterior_face_offset - (exterior_thickness + core_thickness / 2.0)
 
+    def get_core_layer_indices(self, structure):
+        """Вернуть ``(first_core, last_core)`` с кешированием по структуре.
+
+        Структуры кешируются по типу стены в ``get_compound_structure``,
+        поэтому стены одного типа в пакете используют один результат.
+        """
+
+        if structure is None:
+            return None
+        cached = self._core_index_cache.get(structure)
+        if cached is None:
+            cached = (structure.GetFirstCoreLayerIndex(), structure.GetLastCoreLayerIndex())
+            self._core_index_cache[structure] = cached
+        return cached
+
     @staticmethod
     def resolve_wall_location_line(parameter_value):
         try:
-            return WallLocationReference(parameter_value)
-        except ValueError:
-            return WallLocationReference.WALL_CENTERLINE
-
-    def create_wall_from_layer(
-        self,
-        curve,
-        wall_type,
-        base_level_id,
-        base_offset,
-        top_constraint_id,
-        top_offset,
-        unconnected_height,
-        flipped,
-        structural,
-        location_line,
-    ):
-        new_wall = Wall.Create(self.doc, curve, wall_type.Id, base_level_id, unconnected_height, base_offset, flipped, structural)
+            if 0 <= parameter_value < len(_LOC_REF_BY_INT):
+                return _LOC_REF_BY_INT[parameter_value]
+        except TypeError:
+            pass
+        return WallLocationReference.WALL_CENTERLINE
+
+    def create_wall_from_layer(self, curve, wall_type, snapshot, parameter_cache=None):
+        """Создать стену слоя и перенести на неё привязки исходной стены.
+
+        ``parameter_cache`` заполняется параметрами новой стены и затем
+        передаётся в ``copy_instance_parameters``, чтобы те же параметры не
+        запрашивались у Revit второй раз.
+        """
+
+        if parameter_cache is None:
+            parameter_cache = {}
+        base_level_id = snapshot.base_level_id
+        base_offset = snapshot.base_offset
+        top_constraint_id = snapshot.top_constraint_id
+        top_offset = snapshot.top_offset
+        unconnected_height = snapshot.unconnected_height
+        location_line = snapshot.location_line
+        new_wall = Wall.Create(
+            self.doc,
+            curve,
+            wall_type.Id,
+            base_level_id,
+            unconnected_height,
+            base_offset,
+            snapshot.flipped,
+            snapshot.is_structural,
+        )
 
         new_wall_label = format_element_id(new_wall.Id)
 
         top_constraint_param, top_constraint_message = try_get_element_parameter(
-            new_wall, "WALL_HEIGHT_TYPE"
+            new_wall, "WALL_HEIGHT_TYPE", parameter_cache
         )
         if top_constraint_message:
             self.log_diagnostic(
-                "  Новая стена {0}: параметр WALL_HEIGHT_TYPE недоступен ({1}).".format(
-                    new_wall_label,
-                    top_constraint_message,
-                )
+                "  Новая стена {0}: параметр WALL_HEIGHT_TYPE недоступен ({1}).",
+                new_wall_label,
+                top_constraint_message,
             )
         elif top_constraint_param:
             if top_constraint_id != ElementId.InvalidElementId:
-                try_set_parameter(
-                    top_constraint_param,
-                    lambda: top_constraint_param.Set(top_constraint_id),
-                )
+                try_set_parameter(top_constraint_param, top_constraint_id)
             else:
                 unconnected_height_param, unconnected_height_message = try_get_element_parameter(
-                    new_wall, "WALL_USER_HEIGHT_PARAM"
+                    new_wall, "WALL_USER_HEIGHT_PARAM", parameter_cache
                 )
                 if unconnected_height_message:
                     self.log_diagnostic(
-                        "  Новая стена {0}: параметр WALL_USER_HEIGHT_PARAM недоступен ({1}).".format(
-                            new_wall_label,
-                            unconnected_height_message,
-                        )
+                        "  Новая стена {0}: параметр WALL_USER_HEIGHT_PARAM недоступен ({1}).",
+                        new_wall_label,
+                        unconnected_height_message,
                     )
                 elif unconnected_height_param:
-                    try_set_parameter(
-                        unconnected_height_param,
-                        lambda: unconnected_height_param.Set(unconnected_height),
-                    )
+                    try_set_parameter(unconnected_height_param, unconnected_height)
 
         top_offset_param, top_offset_message = try_get_element_parameter(
-            new_wall, "WALL_TOP_OFFSET"
+            new_wall, "WALL_TOP_OFFSET", parameter_cache
         )
         if top_offset_message:
             self.log_diagnostic(
-                "  Новая стена {0}: параметр WALL_TOP_OFFSET недоступен ({1}).".format(
-                    new_wall_label,
-                    top_offset_message,
-                )
+                "  Новая стена {0}: параметр WALL_TOP_OFFSET недоступен ({1}).",
+                new_wall_label,
+                top_offset_message,
             )
         elif top_offset_param:
-            try_set_parameter(top_offset_param, lambda: top_offset_param.Set(top_offset))
+            try_set_parameter(top_offset_param, top_offset)
 
         base_offset_param, base_offset_message = try_get_element_parameter(
-            new_wall, "WALL_BASE_OFFSET"
+            new_wall, "WALL_BASE_OFFSET", parameter_cache
         )
         if base_offset_message:
             self.log_diagnostic(
-                "  Новая стена {0}: параметр WALL_BASE_OFFSET недоступен ({1}).".format(
-                    new_wall_label,
-                    base_offset_message,
-                )
+                "  Новая стена {0}: параметр WALL_BASE_OFFSET недоступен ({1}).",
+                new_wall_label,
+                base_offset_message,
             )
         elif base_offset_param:
-            try_set_parameter(base_offset_param, lambda: base_offset_param.Set(base_offset))
+            try_set_parameter(base_offset_param, base_offset)
 
         base_constraint_param, base_constraint_message = try_get_element_parameter(
-            new_wall, "WALL_BASE_CONSTRAINT"
+            new_wall, "WALL_BASE_CONSTRAINT", parameter_cache
         )
         if base_constraint_message:
             self.log_diagnostic(
-                "  Новая стена {0}: параметр WALL_BASE_CONSTRAINT недоступен ({1}).".format(
-                    new_wall_label,
-                    base_constraint_message,
-                )
+                "  Новая стена {0}: параметр WALL_BASE_CONSTRAINT недоступен ({1}).",
+                new_wall_label,
+                base_constraint_message,
             )
         elif base_constraint_param:
-            try_set_parameter(
-                base_constraint_param,
-                lambda: base_constraint_param.Set(base_level_id),
-            )
+            try_set_parameter(base_constraint_param, base_level_id)
 
         location_line_param, location_line_message = try_get_element_parameter(
-            new_wall, "WALL_KEY_REF_PARAM"
+            new_wall, "WALL_KEY_REF_PARAM", parameter_cache
         )
         if location_line_message:
             self.log_diagnostic(
-                "  Новая стена {0}: параметр WALL_KEY_REF_PARAM недоступен ({1}).".format(
-                    new_wall_label,
-                    location_line_message,
-                )
+                "  Новая стена {0}: параметр WALL_KEY_REF_PARAM недоступен ({1}).",
+                new_wall_label,
+                location_line_message,
             )
         elif location_line_param:
-            try_set_parameter(
-                location_line_param,
-                lambda: location_line_param.Set(location_line),
-            )
+            try_set_parameter(location_line_param, location_line)
 
         return new_wall
 
     @staticmethod
     def create_offset_curve(base_curve, wall_orientation, offset):
-        if math.fabs(offset) < 1e-9:
+        if math.fabs(offset) < _ZERO_OFFSET_EPS:
             return base_curve
         translation = wall_orientation.Multiply(offset)
         transform = Transform.CreateTranslation(translation)
         return base_curve.CreateTransformed(transform)
 
-    def copy_instance_parameters(self, source_wall, target_wall):
-        for built_in_parameter in DEFAULT_PARAMETERS_TO_COPY:
-            source_param = source_wall.get_Parameter(built_in_parameter)
-            target_param = target_wall.get_Parameter(built_in_parameter)
-            if source_param is None or target_param is None:
+    @staticmethod
+    def snapshot_instance_parameters(source_wall, source_parameters=None):
+        """Один раз прочитать значения копируемых параметров исходной стены.
+
+        Возвращает список пар ``(BuiltInParameter, значение)``, который затем
+        применяется к каждой созданной стене без повторного чтения источника.
+        ``source_parameters`` — уже собранные параметры этой стены.
+        """
+
+        parameters_to_copy = DEFAULT_PARAMETERS_TO_COPY
+        source_parameters = _collect_wall_params(source_wall, parameters_to_copy, source_parameters)
+        snapshot = []
+        for built_in_parameter in parameters_to_copy:
+            source_param = source_parameters[built_in_parameter]
+            if source_param is None or not source_param.HasValue:
+                continue
+
+            getter = _STORAGE_DISPATCH.get(source_param.StorageType)
+            if getter is None:
+                continue
+            snapshot.append((built_in_parameter, getter(source_param)))
+        return snapshot
+
+    def copy_instance_parameters(self, parameter_snapshot, target_wall, parameter_cache=None):
+        # Снимок содержит только параметры, у которых есть значение на
+        # исходной стене, поэтому целевой параметр запрашивается лишь для них.
+        # Параметры, которых нет у созданных стен, запоминаются на весь запуск:
+        # все новые стены — базовые стены, и набор их параметров одинаков.
+        # Признак IsReadOnly не кешируется: он зависит от состояния стены
+        # (например, высота доступна только у несвязанной стены).
+        if parameter_cache is None:
+            parameter_cache = {}
+        missing_parameters = self._missing_target_parameters
+        for built_in_parameter, value in parameter_snapshot:
+            if built_in_parameter in missing_parameters:
                 continue
-            if not source_param.HasValue or target_param.IsReadOnly:
+            target_param = parameter_cache.get(built_in_parameter, _MISSING_VALUE)
+            if target_param is _MISSING_VALUE:
+                target_param = target_wall.get_Parameter(built_in_parameter)
+                parameter_cache[built_in_parameter] = target_param
+            if target_param is None:
+                missing_parameters.add(built_in_parameter)
                 continue
+            if target_param.IsReadOnly:
+                continue
+            try_set_parameter(target_param, value)
 
-            storage_type = source_param.StorageType
-            if storage_type == StorageType.Integer:
-                value = source_param.AsInteger()
-                try_set_parameter(target_param, lambda value=value: target_param.Set(value))
-            elif storage_type == StorageType.Double:
-                value = source_param.AsDouble()
-                try_set_parameter(target_param, lambda value=value: target_param.Set(value))
-            elif storage_type == StorageType.String:
-                value = source_param.AsString()
-                try_set_parameter(target_param, lambda value=value: target_param.Set(value))
-            elif storage_type == StorageType.ElementId:
-                value = source_param.AsElementId()
-                try_set_parameter(target_param, lambda value=value: target_param.Set(value))
-
-    def detach_hosted_family_instances(self, wall, hosted_family_ids):
+    def detach_hosted_family_instances(self, wall, hosted_family_ids, source=None):
         detached_instances = []
         failed_to_detach = []
 
         if not hosted_family_ids:
             return detached_instances, failed_to_detach
 
+        # ID из индекса по Host/HostFace уже проверены на привязку к стене.
+        check_host = source != HOSTED_IDS_FROM_HOST_MAP
+        wall_id = wall.Id
+        family_instances = self.get_elements_by_ids(hosted_family_ids)
         for hosted_id in hosted_family_ids:
-            family_instance = self.doc.GetElement(hosted_id)
-            if not isinstance(family_instance, FamilyInstance):
+            family_instance = family_instances.get(hosted_id.IntegerValue)
+            if family_instance is None:
+                family_instance = self.doc.GetElement(hosted_id)
+            # Оба источника ID (индекс по Host и GetDependentElements с
+            # фильтром FamilyInstance) возвращают только экземпляры семейств.
+            if family_instance is None:
                 continue
-            if not is_hosted_by_wall(family_instance, wall.Id):
+            if check_host and not is_hosted_by_wall(family_instance, wall_id):
                 continue
 
             host_parameter, host_message = try_get_element_parameter(
@@ -1359,10 +1692,9 @@ class WallLayerSplitterCommand(object):
             if host_message:
                 failed_to_detach.append(hosted_id)
                 self.log_diagnostic(
-                    "    Семейство {0}: параметр HOST_ID_PARAM недоступен ({1}).".format(
-                        format_element_id(hosted_id),
-                        host_message,
-                    )
+                    "    Семейство {0}: параметр HOST_ID_PARAM недоступен ({1}).",
+                    format_element_id(hosted_id),
+                    host_message,
                 )
                 continue
 
@@ -1390,6 +1722,21 @@ class WallLayerSplitterCommand(object):
                 continue
             try_rehost_family_instance(family_instance, host_wall)
 
+    @contextlib.contextmanager
+    def _detached(self, wall, hosted_family_ids, source=None):
+        """Временно отвязывает семейства от стены на время блока with.
+
+        При выходе из блока семейства один раз возвращаются на исходную
+        стену, если вызывающий код не подтвердил результат через commit().
+        """
+        instances, failed_ids = self.detach_hosted_family_instances(wall, hosted_family_ids, source)
+        detached = DetachedFamilyInstances(instances, failed_ids)
+        try:
+            yield detached
+        finally:
+            if not detached.committed:
+                self.restore_family_instances_to_host(detached.instances, wall)
+
     def rehost_family_instances(self, base_curve, wall_orientation, layer_infos, detached_instances):
         rehosted_ids = []
         unmatched_ids = []
@@ -1397,11 +1744,14 @@ class WallLayerSplitterCommand(object):
         if not layer_infos or not detached_instances:
             return rehosted_ids, unmatched_ids
 
+        offset_table = LayerOffsetTable(layer_infos)
         for family_instance in detached_instances:
             if family_instance is None or not family_instance.IsValidObject:
                 continue
 
-            target_layer = self.select_layer_for_instance(family_instance, base_curve, wall_orientation, layer_infos)
+            target_layer = self.select_layer_for_instance(
+                family_instance, base_curve, wall_orientation, layer_infos, offset_table
+            )
             if target_layer is None:
                 unmatched_ids.append(family_instance.Id)
                 continue
@@ -1413,18 +1763,19 @@ class WallLayerSplitterCommand(object):
 
         return rehosted_ids, unmatched_ids
 
-    def select_layer_for_instance(self, family_instance, base_curve, wall_orientation, layer_infos):
+    def select_layer_for_instance(self, family_instance, base_curve, wall_orientation, layer_infos, offset_table=None):
         tolerance = 1e-6
         offset = try_get_instance_offset(family_instance, base_curve, wall_orientation)
         if offset is not None:
-            candidates = [info for info in layer_infos if info.contains_offset(offset, tolerance)]
-            if candidates:
-                candidates.sort(key=lambda info: abs(info.center_offset - offset))
-                return candidates[0]
+            if offset_table is None:
+                offset_table = LayerOffsetTable(layer_infos)
+            target_layer = offset_table.find(offset, tolerance)
+            if target_layer is not None:
+                return target_layer
 
         return choose_layer_by_function(layer_infos)
 
-    def can_delete_original_wall(self, wall, detached_family_ids):
+    def can_delete_original_wall(self, wall, detached_family_ids, parameter_cache=None):
         reason = ""
         if self.doc is None or wall is None:
             reason = "не удалось получить данные стены."
@@ -1432,11 +1783,13 @@ class WallLayerSplitterCommand(object):
             return False, reason
 
         detected_reasons = []
+        seen_reasons = set()
+        state = self.get_document_state()
         detached_joined_ids = set()
         blocked_joined_ids = set()
         join_detach_failures = []
 
-        if self.doc.IsModifiable:
+        if state.is_modifiable:
             detached_joined = self.try_detach_joined_elements(wall, join_detach_failures, blocked_joined_ids)
             for element_id in detached_joined:
                 detached_joined_ids.add(element_id.IntegerValue)
@@ -1446,27 +1799,23 @@ class WallLayerSplitterCommand(object):
         if join_detach_failures:
             failure_list = ", ".join(sorted(set(join_detach_failures)))
             description = "не удалось разорвать соединение со следующими элементами: " + failure_list
-            self.add_blocking_reason(detected_reasons, description)
+            self.add_blocking_reason(detected_reasons, description, seen_reasons)
 
-        if not self.doc.IsModifiable:
+        if not state.is_modifiable:
             description = "документ открыт только для чтения — изменения недоступны"
-            self.add_blocking_reason(detected_reasons, description)
+            self.add_blocking_reason(detected_reasons, description, seen_reasons)
 
-        if self.doc.IsWorkshared:
-            owner_name = get_element_owner_name(wall)
-            current_user = get_document_username(self.doc)
-            if is_owned_by_another_user(owner_name, current_user):
+        if state.is_workshared:
+            owner_name = self._owner_map.get(wall.Id.IntegerValue)
+            if owner_name is None:
+                owner_name = get_element_owner_name(wall, parameter_cache)
+            if state.is_owned_by_another_user(owner_name):
                 if owner_name:
                     description = "стена занята пользователем \"{0}\"".format(owner_name)
                 else:
                     description = "стена занята другим пользователем"
-                self.add_blocking_reason(detected_reasons, description)
-                self.log_diagnostic(
-                    "Стена {0}: {1}.".format(
-                        format_element_id(wall.Id),
-                        description,
-                    )
-                )
+                self.add_blocking_reason(detected_reasons, description, seen_reasons)
+                self.log_diagnostic("Стена {0}: {1}.", format_element_id(wall.Id), description)
 
             workset_id = wall.WorksetId
             if workset_id != WorksetId.InvalidWorksetId:
@@ -1474,62 +1823,56 @@ class WallLayerSplitterCommand(object):
                 workset = workset_table.GetWorkset(workset_id)
                 if workset is not None and not workset.IsEditable:
                     description = "рабочий набор \"{}\" не передан вам".format(workset.Name)
-                    self.add_blocking_reason(detected_reasons, description)
+                    self.add_blocking_reason(detected_reasons, description, seen_reasons)
 
         if wall.Pinned:
-            self.add_blocking_reason(detected_reasons, "стена закреплена командой Pin")
+            self.add_blocking_reason(detected_reasons, "стена закреплена командой Pin", seen_reasons)
 
         if wall.GroupId != ElementId.InvalidElementId:
-            self.add_blocking_reason(detected_reasons, "стена входит в группу")
+            self.add_blocking_reason(detected_reasons, "стена входит в группу", seen_reasons)
 
-        design_option_id = get_design_option_id(wall)
-        try:
-            active_option = self.doc.ActiveDesignOptionId
-        except (AttributeError, InvalidOperationException):
-            # Свойство ActiveDesignOptionId появилось в API Revit сравнительно недавно,
-            # поэтому на старых версиях приложения его может не быть. В этом случае,
-            # а также если Revit запрещает читать активную дизайн-опцию, считаем,
-            # что активной опции нет (ElementId.InvalidElementId).
-            active_option = ElementId.InvalidElementId
+        design_option_id = get_design_option_id(wall, parameter_cache)
+        active_option = state.active_option_id
         if design_option_id != ElementId.InvalidElementId and design_option_id != active_option:
-            option_description = build_design_option_description(self.doc, design_option_id)
+            option_description = build_design_option_description(
+                self.doc, design_option_id, self._named_description_cache
+            )
             description = "стена принадлежит неактивной дизайн-опции {}".format(option_description)
-            self.add_blocking_reason(detected_reasons, description)
+            self.add_blocking_reason(detected_reasons, description, seen_reasons)
 
         assembly_id = wall.AssemblyInstanceId
         if assembly_id and assembly_id != ElementId.InvalidElementId:
-            assembly_description = build_assembly_description(self.doc, assembly_id)
-            self.add_blocking_reason(detected_reasons, "стена входит в сборку {}".format(assembly_description))
+            assembly_description = build_assembly_description(
+                self.doc, assembly_id, self._named_description_cache
+            )
+            self.add_blocking_reason(detected_reasons, "стена входит в сборку {}".format(assembly_description), seen_reasons)
 
         phase_created_param, phase_message = try_get_element_parameter(
-            wall, "WALL_PHASE_CREATED"
+            wall, "WALL_PHASE_CREATED", parameter_cache
         )
         if phase_message:
             self.log_diagnostic(
-                "Стена {0}: параметр WALL_PHASE_CREATED недоступен ({1}).".format(
-                    format_element_id(wall.Id),
-                    phase_message,
-                )
+                "Стена {0}: параметр WALL_PHASE_CREATED недоступен ({1}).",
+                format_element_id(wall.Id),
+                phase_message,
             )
         elif phase_created_param and phase_created_param.HasValue:
             phase_created_id = phase_created_param.AsElementId()
-            active_phase_id, active_phase_message = try_get_active_view_phase_id(self.doc)
+            active_phase_id = state.active_phase_id
+            active_phase_message = state.active_phase_message
             if active_phase_message:
-                self.log_diagnostic(
-                    "Стена {0}: {1}.".format(
-                        format_element_id(wall.Id),
-                        active_phase_message,
-                    )
-                )
+                self.log_diagnostic("Стена {0}: {1}.", format_element_id(wall.Id), active_phase_message)
             if active_phase_id != ElementId.InvalidElementId and active_phase_id != phase_created_id:
-                phase_description = build_phase_description(self.doc, phase_created_id)
+                phase_description = build_phase_description(
+                    self.doc, phase_created_id, self._named_description_cache
+                )
                 description = "стена создана в фазе {}, отличной от фазы активного вида".format(phase_description)
-                self.add_blocking_reason(detected_reasons, description)
+                self.add_blocking_reason(detected_reasons, description, seen_reasons)
 
         if not detected_reasons:
             dependent_elements = wall.GetDependentElements(None)
             if dependent_elements:
-                blocking_descriptions = []
+                dependent_ids = []
                 for dependent_id in dependent_elements:
                     if dependent_id is None or dependent_id == ElementId.InvalidElementId:
                         continue
@@ -1539,14 +1882,22 @@ class WallLayerSplitterCommand(object):
                         continue
                     if dependent_id.IntegerValue in detached_joined_ids:
                         continue
-                    element = self.doc.GetElement(dependent_id)
+                    dependent_ids.append(dependent_id)
+
+                # Оставшиеся зависимые элементы загружаются одним коллектором.
+                dependents = self.get_elements_by_ids(dependent_ids)
+                blocking_descriptions = []
+                for dependent_id in dependent_ids:
+                    element = dependents.get(dependent_id.IntegerValue)
+                    if element is None:
+                        element = self.doc.GetElement(dependent_id)
                     if element is None or not element.IsValidObject:
                         continue
-                    blocking_descriptions.append(build_element_description(element))
+                    blocking_descriptions.append(self.describe_element(element))
 
                 if blocking_descriptions:
                     description = "у стены остались зависимые элементы: " + ", ".join(sorted(set(blocking_descriptions)))
-                    self.add_blocking_reason(detected_reasons, description)
+                    self.add_blocking_reason(detected_reasons, description, seen_reasons)
 
         if detected_reasons:
             reason = "; ".join(detected_reasons)
@@ -1554,36 +1905,91 @@ class WallLayerSplitterCommand(object):
 
         return True, ""
 
+    def describe_element(self, element):
+        """Описание элемента для сообщений с кешированием по его ID."""
+
+        element_key = get_element_id_value(getattr(element, "Id", None))
+        if element_key is None:
+            return build_element_description(element)
+        description = self._element_description_cache.get(element_key)
+        if description is None:
+            description = build_element_description(element, cached_id=element_key)
+            self._element_description_cache[element_key] = description
+        return description
+
+    def get_document_state(self):
+        """Вернуть снимок свойств документа.
+
+        Внутри execute() используется снимок, снятый после начала транзакции.
+        Вне её снимок строится заново при каждом вызове и не запоминается:
+        IsModifiable меняется при открытии и закрытии транзакции.
+        """
+
+        if self._document_state is None:
+            return DocumentState(self.doc)
+        return self._document_state
+
     def try_detach_joined_elements(self, wall, failure_messages, blocked_element_ids):
         detached_elements = []
         joined_element_ids = JoinGeometryUtils.GetJoinedElements(self.doc, wall)
         if not joined_element_ids:
             return detached_elements
 
-        for joined_id in joined_element_ids:
-            if joined_id is None or joined_id == ElementId.InvalidElementId:
-                continue
+        joined_element_ids = [
+            joined_id
+            for joined_id in joined_element_ids
+            if joined_id is not None and joined_id != ElementId.InvalidElementId
+        ]
+        if not joined_element_ids:
+            return detached_elements
+        joined_elements = self.get_elements_by_ids(joined_element_ids)
 
-            joined_element = self.doc.GetElement(joined_id)
+        for joined_id in joined_element_ids:
+            joined_element = joined_elements.get(joined_id.IntegerValue)
+            if joined_element is None:
+                joined_element = self.doc.GetElement(joined_id)
             if not can_element_be_safely_unjoined(joined_element):
                 if joined_id.IntegerValue not in blocked_element_ids:
-                    failure_messages.append(build_element_description(joined_element))
+                    failure_messages.append(build_element_description(joined_element, cached_id=joined_id.IntegerValue))
                 blocked_element_ids.add(joined_id.IntegerValue)
                 continue
 
             try:
-                if try_unjoin_geometry(self.doc, wall, joined_element):
+                # GetJoinedElements уже гарантирует соединение, поэтому
+                # предварительная проверка AreElementsJoined не нужна.
+                if try_unjoin_geometry(self.doc, wall, joined_element, assume_joined=True):
                     detached_elements.append(joined_id)
                     if isinstance(joined_element, Wall):
                         try_disallow_wall_joins_at_both_ends(wall)
                         try_disallow_wall_joins_at_both_ends(joined_element)
                 else:
-                    failure_messages.append(build_element_description(joined_element))
+                    failure_messages.append(build_element_description(joined_element, cached_id=joined_id.IntegerValue))
             except Exception:  # noqa: BLE001
-                failure_messages.append(build_element_description(joined_element))
+                failure_messages.append(build_element_description(joined_element, cached_id=joined_id.IntegerValue))
 
         return detached_elements
 
+    def get_elements_by_ids(self, element_ids):
+        """Получить элементы по списку ID одним коллектором.
+
+        Возвращает словарь ``{IntegerValue: Element}``. Если коллектор
+        построить не удалось, словарь пуст и вызывающий код запрашивает
+        элементы по одному через ``GetElement``.
+        """
+
+        elements = {}
+        if not element_ids:
+            return elements
+        try:
+            id_collection = List[ElementId](element_ids) if List is not None else list(element_ids)
+            collector = FilteredElementCollector(self.doc, id_collection)
+            for element in collector.WhereElementIsNotElementType().ToElements():
+                elements[element.Id.IntegerValue] = element
+        except Exception as error:  # noqa: BLE001
+            LOGGER.debug("Не удалось получить элементы одним коллектором: %s", error)
+            elements.clear()
+        return elements
+
     def show_summary(self, results, skipped_messages):
         builder = ["Результат разделения слоев стен:"]
         total_created = 0
@@ -1598,29 +2004,30 @@ class WallLayerSplitterCommand(object):
             total_failed_detach += len(result.failed_detach_instance_ids)
 
             builder.append(
-                "Стена {0} -> создано {1} стен.".format(
+                "Стена %s -> создано %d стен."
+                % (
                     format_element_id(result.original_wall_id, result.original_wall_id_value),
                     len(result.created_wall_ids),
                 )
             )
             if result.rehosted_instance_ids:
-                builder.append("    Перепривязано семейств: {0}.".format(len(result.rehosted_instance_ids)))
+                builder.append("    Перепривязано семейств: %d." % len(result.rehosted_instance_ids))
             if result.unmatched_instance_ids:
                 unmatched_list = ", ".join(
                     format_element_id(element_id) for element_id in result.unmatched_instance_ids
                 )
-                builder.append("    Не удалось перепривязать автоматически: {0}.".format(unmatched_list))
+                builder.append("    Не удалось перепривязать автоматически: %s." % unmatched_list)
             if result.failed_detach_instance_ids:
                 failed_list = ", ".join(
                     format_element_id(element_id) for element_id in result.failed_detach_instance_ids
                 )
-                builder.append("    Не удалось временно отвязать: {0}.".format(failed_list))
+                builder.append("    Не удалось временно отвязать: %s." % failed_list)
 
         if skipped_messages:
             builder.append("")
             builder.append("Стены, которые не удалось обработать:")
             for message in sorted(set(skipped_messages)):
-                builder.append("- {0}".format(message))
+                builder.append("- %s" % message)
 
         summary_text = "\n".join(builder)
         TaskDialog.Show("Разделение слоев стен", summary_text)
@@ -1631,15 +2038,11 @@ class WallLayerSplitterCommand(object):
             return
         formatted = format_skip_reason(reason)
         wall_label = format_element_id(wall_id)
-        message = "Стена {0}: {1}".format(wall_label, formatted)
-        if message not in self.skip_messages:
+        message = "Стена %s: %s" % (wall_label, formatted)
+        if message not in self._skip_message_set:
+            self._skip_message_set.add(message)
             self.skip_messages.append(message)
-        self.log_diagnostic(
-            "Пропуск стены {0}: {1}".format(
-                wall_label,
-                formatted.replace("\n", " "),
-            )
-        )
+        self.log_diagnostic("Пропуск стены {0}: {1}", wall_label, formatted.replace("\n", " "))
 
     def build_skip_details(self, skipped_messages):
         if not skipped_messages:
@@ -1649,26 +2052,54 @@ class WallLayerSplitterCommand(object):
             lines.append("- {0}".format(message))
         return "\n".join(lines)
 
-    def add_blocking_reason(self, detected_reasons, reason):
-        if reason:
-            normalized = reason.strip()
-            if normalized and normalized not in detected_reasons:
-                detected_reasons.append(normalized)
-                self.log_diagnostic("Блокирующая проверка: {}".format(normalized))
+    def add_blocking_reason(self, detected_reasons, reason, seen_reasons=None):
+        """Добавить причину блокировки без повторов.
+
+        ``seen_reasons`` — необязательное множество уже добавленных причин
+        для проверки повторов без прохода по списку.
+        """
+
+        if not reason:
+            return
+        normalized = reason.strip()
+        if not normalized:
+            return
+        if seen_reasons is None:
+            if normalized in detected_reasons:
+                return
+        elif normalized in seen_reasons:
+            return
+        else:
+            seen_reasons.add(normalized)
+        detected_reasons.append(normalized)
+        self.log_diagnostic("Блокирующая проверка: {}", normalized)
+
+    def log_diagnostic(self, message, *args):
+        """Добавить запись в диагностический журнал.
+
+        Шаблон с аргументами сохраняется как есть и форматируется только при
+        чтении журнала (см. ``get_recent_diagnostics``), то есть лишь когда
+        диагностика действительно показывается пользователю.
+        """
 
-    def log_diagnostic(self, message):
         if not message:
             return
-        self.diagnostic_log.append(message)
-        if len(self.diagnostic_log) > 100:
-            self.diagnostic_log = self.diagnostic_log[-100:]
+        self.diagnostic_log.append((message, args) if args else message)
+
+    @staticmethod
+    def format_diagnostic_entry(entry):
+        if isinstance(entry, tuple):
+            template, args = entry
+            return template.format(*args)
+        return entry
 
     def get_recent_diagnostics(self, limit=10):
         if not self.diagnostic_log:
             return []
-        if not limit or limit <= 0:
-            return list(self.diagnostic_log)
-        return self.diagnostic_log[-limit:]
+        entries = self.diagnostic_log
+        if limit and 0 < limit < len(entries):
+            entries = itertools.islice(entries, len(entries) - limit, None)
+        return [self.format_diagnostic_entry(entry) for entry in entries]
 
     @staticmethod
     def extract_error_message(error):
@@ -1728,8 +2159,10 @@ class WallLayerSplitterCommand(object):
             OUTPUT.print_md("Диагностическая информация отсутствует. Проверьте журнал pyRevit.")
 
     def build_layer_type_key(self, base_type_id, layer, index):
+        # Ключ — кортеж, а не строка: он хешируется без форматирования и
+        # однозначно описывает слой (тип-основа, материал, функция, позиция, толщина).
         material_id = layer.MaterialId.IntegerValue if layer.MaterialId else -1
-        return "{0}-{1}-{2}-{3}".format(base_type_id.IntegerValue, material_id, index, round(layer.Width, 8))
+        return (base_type_id.IntegerValue, material_id, layer.Function, index, round(layer.Width, 8))
 
     def set_structural_material(self, wall_type, material_id):
         if material_id == ElementId.InvalidElementId:
@@ -1745,30 +2178,43 @@ class WallLayerSplitterCommand(object):
             )
             return
         if structural_param:
-            try_set_parameter(structural_param, lambda: structural_param.Set(material_id))
+            try_set_parameter(structural_param, material_id)
 
-    def build_layer_type_name(self, base_type, layer, index):
-        material_name = "Без материала"
-        if layer.MaterialId != ElementId.InvalidElementId:
-            material = base_type.Document.GetElement(layer.MaterialId)
-            if isinstance(material, Material):
+    def get_material_name(self, document, material_id):
+        """Имя материала слоя с кешированием по ID материала."""
+
+        if material_id == ElementId.InvalidElementId:
+            return "Без материала"
+        material_key = get_element_id_value(material_id)
+        material_name = self._material_name_cache.get(material_key)
+        if material_name is None:
+            material_name = "Без материала"
+            # MaterialId слоя ссылается только на материал, поэтому достаточно
+            # проверки на None; safe_get_name сам обрабатывает отсутствие Name.
+            material = document.GetElement(material_id)
+            if material is not None:
                 material_value = safe_get_name(material)
                 if material_value:
                     material_name = material_value
+            self._material_name_cache[material_key] = material_name
+        return material_name
+
+    def build_layer_type_name(self, base_type, layer, index):
+        material_name = self.get_material_name(base_type.Document, layer.MaterialId)
         millimeters_per_foot = 304.8
         width_mm = layer.Width * millimeters_per_foot
         components = [
             sanitize_name_component(base_type.Name),
-            "Слой {0}".format(index + 1),
+            "Слой %d" % (index + 1),
             sanitize_name_component(str(layer.Function)),
             sanitize_name_component(material_name),
-            "{0:.0f}мм".format(width_mm),
+            "%.0fмм" % width_mm,
         ]
         raw_name = " - ".join([part for part in components if part])
         return make_valid_wall_type_name(raw_name)
 
 
-DEFAULT_PARAMETERS_TO_COPY = []
+DEFAULT_PARAMETERS_TO_COPY = ()
 
 
 def build_default_parameters():
@@ -1809,20 +2255,32 @@ def build_default_parameters():
         if parameter not in parameters:
             parameters.append(parameter)
 
-    return parameters
+    return tuple(parameters)
 
 
 DEFAULT_PARAMETERS_TO_COPY = build_default_parameters()
 
+# Чтение значения параметра по его StorageType одним поиском в словаре
+# вместо цепочки сравнений для каждого параметра.
+_STORAGE_DISPATCH = {
+    StorageType.Integer: operator.methodcaller("AsInteger"),
+    StorageType.Double: operator.methodcaller("AsDouble"),
+    StorageType.String: operator.methodcaller("AsString"),
+    StorageType.ElementId: operator.methodcaller("AsElementId"),
+}
+
 
-def try_get_core_thicknesses(structure, layers):
+def try_get_core_thicknesses(structure, layers, core_indices=None):
     if structure is None:
         return False, 0.0, 0.0, 0.0
     exterior = 0.0
     core = 0.0
     interior = 0.0
-    first_core = structure.GetFirstCoreLayerIndex()
-    last_core = structure.GetLastCoreLayerIndex()
+    if core_indices is None:
+        first_core = structure.GetFirstCoreLayerIndex()
+        last_core = structure.GetLastCoreLayerIndex()
+    else:
+        first_core, last_core = core_indices
     if first_core < 0 or last_core < 0 or last_core < first_core:
         return False, 0.0, 0.0, 0.0
 
@@ -1842,11 +2300,15 @@ def try_get_instance_offset(family_instance, reference_curve, wall_orientation):
     if family_instance is None or reference_curve is None or wall_orientation is None:
         return None
 
+    # Проверка атрибутов вместо isinstance по CLR-типам: у LocationPoint есть
+    # Point, у LocationCurve — Curve.
     location = family_instance.Location
-    if isinstance(location, LocationPoint):
-        return project_offset(location.Point, reference_curve, wall_orientation)
-    if isinstance(location, LocationCurve) and location.Curve is not None:
-        midpoint = location.Curve.Evaluate(0.5, True)
+    point = getattr(location, "Point", None)
+    if point is not None:
+        return project_offset(point, reference_curve, wall_orientation)
+    curve = getattr(location, "Curve", None)
+    if curve is not None:
+        midpoint = curve.Evaluate(0.5, True)
         return project_offset(midpoint, reference_curve, wall_orientation)
     return None
 
@@ -1885,11 +2347,11 @@ def try_rehost_family_instance(family_instance, new_host):
         return False
 
 
-def try_set_parameter(parameter, setter):
+def try_set_parameter(parameter, value):
     if parameter is None or parameter.IsReadOnly:
         return
     try:
-        setter()
+        parameter.Set(value)
     except (InvalidOperationException, ArgumentException):
         pass
 
@@ -1912,14 +2374,15 @@ def can_element_be_safely_unjoined(element):
     return isinstance(element, HostObject)
 
 
-def try_unjoin_geometry(document, first, second):
+def try_unjoin_geometry(document, first, second, assume_joined=False):
     if document is None or first is None or second is None:
         return False
-    try:
-        if not JoinGeometryUtils.AreElementsJoined(document, first, second):
+    if not assume_joined:
+        try:
+            if not JoinGeometryUtils.AreElementsJoined(document, first, second):
+                return True
+        except (InvalidOperationException, ArgumentException):
             return True
-    except (InvalidOperationException, ArgumentException):
-        return True
 
     try:
         JoinGeometryUtils.UnjoinGeometry(document, first, second)
@@ -1951,61 +2414,127 @@ def get_document_username(document):
         application = None
     if application is None:
         return ""
+    # getattr со значением по умолчанию подавлял бы только AttributeError,
+    # поэтому прямое обращение с узким except ведёт себя так же.
     try:
         username = application.Username
-    except Exception:  # noqa: BLE001
-        username = getattr(application, "Username", None)
+    except AttributeError:
+        username = None
     if not username:
         return ""
     return str(username).strip()
 
 
-def get_element_owner_name(element):
+def get_element_owner_name(element, parameter_cache=None):
+    """Имя пользователя, занявшего элемент (параметр EDITED_BY).
+
+    Вызывать имеет смысл только для совместно используемых документов:
+    в остальных параметр всегда пуст. ``parameter_cache`` — словарь
+    параметров элемента, как в try_get_element_parameter.
+    """
+
     if element is None:
         return ""
-    owner_param, owner_message = try_get_element_parameter(element, "EDITED_BY")
+    owner_param, owner_message = try_get_element_parameter(element, "EDITED_BY", parameter_cache)
     if owner_message or owner_param is None:
         return ""
-    try:
-        owner_value = owner_param.AsString()
-    except Exception:  # noqa: BLE001
-        owner_value = None
-    if not owner_value:
+    # Проверка типа хранения дешевле, чем исключение из AsString() у
+    # параметра без строкового значения.
+    if owner_param.StorageType != StorageType.String:
         return ""
-    return str(owner_value).strip()
+    owner_value = owner_param.AsString()
+    return owner_value.strip() if owner_value else ""
+
+
+def get_owners_bulk(document, element_ids):
+    """Владельцы элементов, собранные до проверок стен.
+
+    Для каждого ID выполняется один вызов GetCheckoutStatus с выходным
+    параметром owner: статус и имя владельца приходят вместе. Возвращает
+    словарь ``{ID: имя владельца}``; для свободных элементов имя пустое.
+    Элементы, статус которых получить не удалось, в словарь не попадают.
+    Для документов без совместной работы сразу возвращается пустой словарь.
+    """
+
+    owners = {}
+    if document is None or not document.IsWorkshared:
+        return owners
+    for element_id in element_ids:
+        try:
+            # Перегрузка с out-параметром возвращает кортеж (статус, владелец).
+            status, owner_name = WorksharingUtils.GetCheckoutStatus(document, element_id, None)
+            if status == CheckoutStatus.NotOwned:
+                owner_name = ""
+        except Exception as error:  # noqa: BLE001
+            LOGGER.debug(
+                "Не удалось получить владельца элемента %s: %s",
+                format_element_id(element_id),
+                error,
+            )
+            continue
+        owners[element_id.IntegerValue] = owner_name.strip() if owner_name else ""
+    return owners
+
+
+_NORMALIZED_USERNAMES = {}
+_NORMALIZED_USERNAMES_LIMIT = 1024
 
 
 def normalize_username(username):
     if not username:
         return ""
-    return str(username).strip().lower()
+    key = username if isinstance(username, str) else str(username)
+    normalized = _NORMALIZED_USERNAMES.get(key)
+    if normalized is None:
+        # Имён пользователей в модели немного; при переполнении кеш просто
+        # очищается, чтобы его размер оставался ограниченным.
+        if len(_NORMALIZED_USERNAMES) >= _NORMALIZED_USERNAMES_LIMIT:
+            _NORMALIZED_USERNAMES.clear()
+        normalized = key.strip().lower()
+        _NORMALIZED_USERNAMES[key] = normalized
+    return normalized
 
 
-def is_owned_by_another_user(owner_name, current_username):
-    owner = normalize_username(owner_name)
-    if not owner:
-        return False
-    current = normalize_username(current_username)
-    if not current:
-        return True
-    return owner != current
+def build_ownership_checker(current_username):
+    """Создать проверку «элемент занят другим пользователем».
+
+    Имя текущего пользователя нормализуется один раз при создании проверки,
+    а не при каждом вызове для очередного элемента.
+    """
+
+    current_normalized = normalize_username(current_username)
+
+    def check(owner_name):
+        owner = normalize_username(owner_name)
+        if not owner:
+            return False
+        return not current_normalized or owner != current_normalized
+
+    return check
+
+
+def build_element_description(element, *, cached_id=None):
+    """Описание элемента для сообщений пользователю.
 
+    Уже известный вызывающему коду числовой ID можно передать в
+    ``cached_id``, чтобы не запрашивать его у Revit API повторно.
+    """
 
-def build_element_description(element):
     if element is None:
         return "неизвестный элемент"
-    category = getattr(element, "Category", None)
-    category_name = safe_get_name(category)
+    if cached_id is None:
+        cached_id = get_element_id_value(getattr(element, "Id", None))
+    identifier = cached_id or 0
     element_name = safe_get_name(element)
-    identifier = get_element_id_value(getattr(element, "Id", None)) or 0
-    if category_name and element_name:
-        return "{0} \"{1}\" (ID {2})".format(category_name, element_name, identifier)
-    if element_name:
-        return "{0} (ID {1})".format(element_name, identifier)
-    return "ID {0}".format(identifier)
+    if not element_name:
+        return "ID %d" % identifier
+    category_name = safe_get_name(getattr(element, "Category", None))
+    if category_name:
+        return '%s "%s" (ID %d)' % (category_name, element_name, identifier)
+    return "%s (ID %d)" % (element_name, identifier)
 
 
-def get_design_option_id(element):
+def get_design_option_id(element, parameter_cache=None):
     if element is None:
         return ElementId.InvalidElementId
     try:
@@ -2014,7 +2543,7 @@ def get_design_option_id(element):
             return design_option.Id
     except InvalidOperationException:
         pass
-    option_param, option_message = try_get_element_parameter(element, "DESIGN_OPTION_ID")
+    option_param, option_message = try_get_element_parameter(element, "DESIGN_OPTION_ID", parameter_cache)
     if option_message or option_param is None:
         return ElementId.InvalidElementId
 
@@ -2024,66 +2553,69 @@ def get_design_option_id(element):
         return ElementId.InvalidElementId
 
 
-def build_design_option_description(document, design_option_id):
-    if document is None or design_option_id is None or design_option_id == ElementId.InvalidElementId:
-        identifier = design_option_id.IntegerValue if isinstance(design_option_id, ElementId) else 0
-        return "ID {0}".format(identifier)
-    element = document.GetElement(design_option_id)
-    if isinstance(element, DesignOption):
-        option_name = safe_get_name(element)
-        if option_name:
-            return '\"{0}\" (ID {1})'.format(option_name, design_option_id.IntegerValue)
-    return "ID {0}".format(design_option_id.IntegerValue)
-
-
-def build_assembly_description(document, assembly_id):
-    if document is None or assembly_id is None or assembly_id == ElementId.InvalidElementId:
-        identifier = assembly_id.IntegerValue if isinstance(assembly_id, ElementId) else 0
-        return "ID {0}".format(identifier)
-    element = document.GetElement(assembly_id)
-    if isinstance(element, AssemblyInstance):
-        assembly_name = safe_get_name(element)
-        if assembly_name:
-            return '\"{0}\" (ID {1})'.format(assembly_name, assembly_id.IntegerValue)
-    return "ID {0}".format(assembly_id.IntegerValue)
-
-
-def build_phase_description(document, phase_id):
-    if document is None or phase_id is None or phase_id == ElementId.InvalidElementId:
-        identifier = phase_id.IntegerValue if isinstance(phase_id, ElementId) else 0
-        return "ID {0}".format(identifier)
-    element = document.GetElement(phase_id)
-    if isinstance(element, Phase):
-        phase_name = safe_get_name(element)
-        if phase_name:
-            return '\"{0}\" (ID {1})'.format(phase_name, phase_id.IntegerValue)
-    return "ID {0}".format(phase_id.IntegerValue)
+def _build_named_description(document, element_id, expected_type, description_cache=None):
+    """Описание вида ``"Имя" (ID n)`` для элемента ожидаемого типа.
 
+    ``description_cache`` — необязательный словарь ``{ID: описание}``:
+    одна и та же дизайн-опция, сборка или фаза встречается у многих стен,
+    и повторный GetElement для неё не нужен.
+    """
 
+    if document is None or element_id is None or element_id == ElementId.InvalidElementId:
+        identifier = element_id.IntegerValue if isinstance(element_id, ElementId) else 0
+        return "ID %d" % identifier
+    identifier = element_id.IntegerValue
+    if description_cache is not None:
+        description = description_cache.get(identifier)
+        if description is not None:
+            return description
+    element = document.GetElement(element_id)
+    description = None
+    if isinstance(element, expected_type):
+        element_name = safe_get_name(element)
+        if element_name:
+            description = '"%s" (ID %d)' % (element_name, identifier)
+    if description is None:
+        description = "ID %d" % identifier
+    if description_cache is not None:
+        description_cache[identifier] = description
+    return description
+
+
+def build_design_option_description(document, design_option_id, description_cache=None):
+    return _build_named_description(document, design_option_id, DesignOption, description_cache)
+
+
+def build_assembly_description(document, assembly_id, description_cache=None):
+    return _build_named_description(document, assembly_id, AssemblyInstance, description_cache)
+
+
+def build_phase_description(document, phase_id, description_cache=None):
+    return _build_named_description(document, phase_id, Phase, description_cache)
+
+
+@functools.lru_cache(maxsize=1024)
 def sanitize_name_component(value):
-    if not value:
-        return ""
-    invalid_chars = {':', ';', '{', '}', '[', ']', '|', '\\', '/', '<', '>', '?', '*', '"'}
-    return ''.join('_' if ch in invalid_chars else ch for ch in value).strip()
+    # Пробелы по краям убираются до замены, чтобы краевые управляющие символы
+    # (табуляция, перевод строки) не превращались в "_".
+    return value.strip().translate(_INVALID_TYPE_NAME_TRANSLATE).strip() if value else ""
 
 
 def format_skip_reason(reason):
     if not reason:
         return ""
-    trimmed = reason.strip().rstrip('.')
-    parts = [part.strip() for part in trimmed.split(';') if part.strip()]
-    if len(parts) <= 1:
-        return ensure_sentence_ending(trimmed)
-    return "\n".join('• ' + ensure_sentence_ending(part) for part in parts)
-
-
-def ensure_sentence_ending(text):
-    if not text:
+    # Один проход по частям: каждая часть очищается от пробелов и завершающих
+    # точек и получает ровно одну точку в конце.
+    parts = []
+    for segment in reason.split(';'):
+        segment = segment.strip().rstrip('.').rstrip()
+        if segment:
+            parts.append(segment)
+    if not parts:
         return ""
-    text = text.strip()
-    if not text.endswith('.'):
-        text += '.'
-    return text
+    if len(parts) == 1:
+        return parts[0] + '.'
+    return "\n".join('• ' + part + '.' for part in parts)
 
 
 def main():
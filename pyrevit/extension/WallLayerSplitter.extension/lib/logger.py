@@ -10,6 +10,10 @@
 в собственный файл ``WallLayerSplitter.log``. Благодаря этому журнал
 появится даже у пользователей, у которых штатная папка ``%APPDATA%\\pyRevit\\Logs``
 пока отсутствует.
+
+Если недоступны ни pyRevit, ни Revit API (импорт для тестов или статического
+анализа на заглушках ``revit_stub``), журнал отключается: логгер получает
+только ``NullHandler`` и не пишет на диск.
 """
 
 import logging
@@ -28,9 +32,18 @@ except Exception:  # noqa: BLE001
     script = None
 
 
+__all__ = ["get_logger", "log_debug", "log_info", "log_warning", "log_error"]
+
 _FALLBACK_LOGGER_NAME = "WallLayerSplitter"
-_FALLBACK_LOGGER_LOCK = threading.Lock()
+# RLock: базовый логгер разрешается под этой же блокировкой и может
+# вложенно вызвать настройку резервного логгера.
+_FALLBACK_LOGGER_LOCK = threading.RLock()
 _FALLBACK_LOGGER = None  # type: Optional[logging.Logger]
+_FALLBACK_FORMATTER = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+_BASE_LOGGER = None  # type: Optional[logging.Logger]
+_CHILD_LOGGERS = {}
+# Каталог логов, существование которого уже проверено.
+_READY_LOG_DIR = None
 
 
 def _get_default_log_dir():
@@ -61,18 +74,48 @@ def _get_default_log_dir():
 
 
 def _ensure_log_dir():
-    """Убедиться, что каталог логов существует."""
+    """Убедиться, что каталог логов существует.
+
+    После первой успешной проверки каталог запоминается, и повторные вызовы
+    не обращаются к файловой системе.
+    """
+
+    global _READY_LOG_DIR
+
+    if _READY_LOG_DIR is not None:
+        return _READY_LOG_DIR
 
     log_dir = _get_default_log_dir()
     if not log_dir:
         return log_dir
 
+    os.makedirs(log_dir, exist_ok=True)
+    _READY_LOG_DIR = log_dir
+    return log_dir
+
+
+def _is_stub_environment():
+    """Проверить, что модуль работает вне Revit, на заглушках revit_stub."""
+
+    if script is not None:
+        return False
     try:
-        os.makedirs(log_dir)
+        import Autodesk.Revit.DB  # type: ignore  # noqa: F401
     except Exception:  # noqa: BLE001
-        if not os.path.isdir(log_dir):
-            raise
-    return log_dir
+        return True
+    return False
+
+
+def _configure_null_logger():
+    """Создать отключённый логгер для запуска на заглушках."""
+
+    logger = logging.getLogger(_FALLBACK_LOGGER_NAME)
+    logger.setLevel(logging.CRITICAL + 1)
+    logger.propagate = False
+    if not any(isinstance(handler, logging.NullHandler) for handler in logger.handlers):
+        logger.addHandler(logging.NullHandler())
+    logger.disabled = True
+    return logger
 
 
 def _configure_fallback_logger():
@@ -98,9 +141,7 @@ def _configure_fallback_logger():
                 backupCount=3,
                 encoding="utf-8",
             )
-            handler.setFormatter(
-                logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
-            )
+            handler.setFormatter(_FALLBACK_FORMATTER)
             logger.addHandler(handler)
 
         _FALLBACK_LOGGER = logger
@@ -108,16 +149,38 @@ def _configure_fallback_logger():
 
 
 def _get_base_logger():
-    """Получить базовый логгер pyRevit или резервный вариант."""
+    """Получить базовый логгер pyRevit или резервный вариант.
 
-    if script:
-        try:
-            _ensure_log_dir()
-            return script.get_logger()
-        except Exception:  # noqa: BLE001
-            pass
+    Логгер разрешается один раз и запоминается: проверка каталога логов и
+    обращение к pyRevit не повторяются на каждой строке журнала.
+    """
+
+    global _BASE_LOGGER
+
+    logger = _BASE_LOGGER
+    if logger is not None:
+        return logger
 
-    return _configure_fallback_logger()
+    with _FALLBACK_LOGGER_LOCK:
+        if _BASE_LOGGER is not None:
+            return _BASE_LOGGER
+
+        logger = None
+        if script:
+            try:
+                _ensure_log_dir()
+                logger = script.get_logger()
+            except Exception:  # noqa: BLE001
+                logger = None
+
+        if logger is None:
+            if _is_stub_environment():
+                logger = _configure_null_logger()
+            else:
+                logger = _configure_fallback_logger()
+
+        _BASE_LOGGER = logger
+        return logger
 
 
 def get_logger(name=None):
@@ -128,13 +191,32 @@ def get_logger(name=None):
     """
 
     base_logger = _get_base_logger()
-    if name:
-        return base_logger.getChild(name)
-    return base_logger
+    if not name:
+        return base_logger
+
+    child = _CHILD_LOGGERS.get(name)
+    if child is None:
+        child = base_logger.getChild(name)
+        _CHILD_LOGGERS[name] = child
+    return child
 
 
 def log_debug(message):
-    get_logger().debug(message)
+    """Записать отладочное сообщение.
+
+    Уровень проверяется до обращения к ``debug()``: при выключенной отладке
+    вызов завершается сразу. У стандартного ``logging.Logger`` запись идёт
+    напрямую через ``_log``; обёртки pyRevit с собственным ``debug()``
+    вызываются как обычно.
+    """
+
+    logger = _BASE_LOGGER or get_logger()
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if type(logger).debug is logging.Logger.debug:
+        logger._log(logging.DEBUG, message, ())
+    else:
+        logger.debug(message)
 
 
 def log_info(message):
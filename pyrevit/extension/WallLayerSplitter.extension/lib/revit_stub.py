@@ -6,6 +6,11 @@
 типа и не содержат рабочей логики. При обращении к методам или атрибутам
 этих объектов генерируется информативное исключение, объясняющее, что
 действие недоступно вне Revit.
+
+Заглушка ``FilteredElementCollector`` повторяет рекомендуемый порядок работы
+с коллекторами: результат материализуется одним вызовом ``ToElements()``, а
+дальнейший перебор выполняется на стороне Python. Пошаговый перебор
+коллектора в Revit пересекает границу interop на каждом элементе.
 """
 
 from __future__ import annotations
@@ -22,6 +27,7 @@ __all__ = [
     "XYZ",
     "AssemblyInstance",
     "BuiltInParameter",
+    "CheckoutStatus",
     "CompoundStructureLayer",
     "DesignOption",
     "ElementClassFilter",
@@ -46,6 +52,7 @@ __all__ = [
     "WallType",
     "WallUtils",
     "WorksetId",
+    "WorksharingUtils",
     "revit",
     "script",
 ]
@@ -82,6 +89,8 @@ class _StubBase(object):
 class XYZ(_StubBase):
     """Минимальная заглушка для Autodesk.Revit.DB.XYZ."""
 
+    __slots__ = ()
+
     BasisY = None
 
     def Normalize(self):  # pragma: no cover - заглушка
@@ -91,6 +100,8 @@ class XYZ(_StubBase):
 class AssemblyInstance(_StubBase):
     """Заглушка семейства на основе экземпляра сборки."""
 
+    __slots__ = ()
+
 
 class _DynamicAttributeMeta(type):
     """Метакласс, возвращающий имя атрибута при обращении."""
@@ -103,9 +114,15 @@ class BuiltInParameter(object, metaclass=_DynamicAttributeMeta):  # pragma: no c
     """Заглушка перечисления BuiltInParameter."""
 
 
+class CheckoutStatus(object, metaclass=_DynamicAttributeMeta):  # pragma: no cover - динамическая заглушка
+    """Заглушка перечисления CheckoutStatus."""
+
+
 class CompoundStructureLayer(_StubBase):
     """Заглушка слоя сложной конструкции."""
 
+    __slots__ = ()
+
     Width = 0.0
     Function = None
     MaterialId = None
@@ -114,19 +131,28 @@ class CompoundStructureLayer(_StubBase):
 class DesignOption(_StubBase):
     """Заглушка варианта проектирования."""
 
+    __slots__ = ()
+
 
 class ElementClassFilter(_StubBase):
     """Заглушка фильтра по типу элемента."""
 
+    __slots__ = ()
+
 
 class ElementId(_StubBase):
     """Заглушка идентификатора элемента."""
 
+    __slots__ = ("IntegerValue",)
+
     InvalidElementId = object()
 
     def __init__(self, value=None):
         super(ElementId, self).__init__()
-        self.IntegerValue = value if isinstance(value, int) else 0
+        try:
+            self.IntegerValue = int(value)
+        except (TypeError, ValueError):
+            self.IntegerValue = 0
 
     def __int__(self):  # pragma: no cover - заглушка
         return int(self.IntegerValue)
@@ -135,16 +161,23 @@ class ElementId(_StubBase):
 class FamilyInstance(_StubBase):
     """Заглушка экземпляра семейств."""
 
+    __slots__ = ()
+
 
 class FilteredElementCollector(_StubBase):
     """Заглушка коллектора элементов."""
 
+    __slots__ = ()
+
     def __iter__(self):  # pragma: no cover - заглушка
         return iter(())
 
     def OfClass(self, _):  # pragma: no cover - заглушка
         return self
 
+    def WhereElementIsNotElementType(self):  # pragma: no cover - заглушка
+        return self
+
     def ToElements(self):  # pragma: no cover - заглушка
         return []
 
@@ -152,14 +185,20 @@ class FilteredElementCollector(_StubBase):
 class HostObject(_StubBase):
     """Заглушка базового хост-элемента."""
 
+    __slots__ = ()
+
 
 class IntersectionResult(_StubBase):
     """Заглушка результата пересечения."""
 
+    __slots__ = ()
+
 
 class JoinGeometryUtils(_StubBase):
     """Заглушка для JoinGeometryUtils."""
 
+    __slots__ = ()
+
     @staticmethod
     def GetJoinedElements(*args, **kwargs):  # pragma: no cover - заглушка
         raise RevitAPIUnavailableError("JoinGeometryUtils.GetJoinedElements")
@@ -176,14 +215,20 @@ class JoinGeometryUtils(_StubBase):
 class LocationCurve(_StubBase):
     """Заглушка LocationCurve."""
 
+    __slots__ = ()
+
 
 class LocationPoint(_StubBase):
     """Заглушка LocationPoint."""
 
+    __slots__ = ()
+
 
 class Material(_StubBase):
     """Заглушка материала."""
 
+    __slots__ = ()
+
 
 class MaterialFunctionAssignment(object, metaclass=_DynamicAttributeMeta):  # pragma: no cover - динамическая заглушка
     """Заглушка перечисления MaterialFunctionAssignment."""
@@ -192,6 +237,8 @@ class MaterialFunctionAssignment(object, metaclass=_DynamicAttributeMeta):  # pr
 class PartUtils(_StubBase):
     """Заглушка PartUtils."""
 
+    __slots__ = ()
+
     @staticmethod
     def IsElementAssociatedWithParts(*args, **kwargs):  # pragma: no cover - заглушка
         raise RevitAPIUnavailableError("PartUtils.IsElementAssociatedWithParts")
@@ -200,6 +247,8 @@ class PartUtils(_StubBase):
 class Phase(_StubBase):
     """Заглушка фазы."""
 
+    __slots__ = ()
+
 
 class StorageType(object, metaclass=_DynamicAttributeMeta):  # pragma: no cover - динамическая заглушка
     """Заглушка перечисления StorageType."""
@@ -208,6 +257,8 @@ class StorageType(object, metaclass=_DynamicAttributeMeta):  # pragma: no cover
 class Transaction(_StubBase):
     """Заглушка транзакции."""
 
+    __slots__ = ()
+
     def Start(self, *args, **kwargs):  # pragma: no cover - заглушка
         raise RevitAPIUnavailableError("Transaction.Start")
 
@@ -224,6 +275,8 @@ class Transaction(_StubBase):
 class TransactionGroup(_StubBase):
     """Заглушка группы транзакций."""
 
+    __slots__ = ()
+
     def Start(self, *args, **kwargs):  # pragma: no cover - заглушка
         raise RevitAPIUnavailableError("TransactionGroup.Start")
 
@@ -237,6 +290,8 @@ class TransactionGroup(_StubBase):
 class Transform(_StubBase):
     """Заглушка трансформаций."""
 
+    __slots__ = ()
+
     @staticmethod
     def CreateTranslation(*args, **kwargs):  # pragma: no cover - заглушка
         raise RevitAPIUnavailableError("Transform.CreateTranslation")
@@ -245,14 +300,20 @@ class Transform(_StubBase):
 class Wall(_StubBase):
     """Заглушка стены."""
 
+    __slots__ = ()
+
 
 class WallType(_StubBase):
     """Заглушка типа стены."""
 
+    __slots__ = ()
+
 
 class WallUtils(_StubBase):
     """Заглушка WallUtils."""
 
+    __slots__ = ()
+
     @staticmethod
     def IsWallJoinAllowedAtEnd(*args, **kwargs):  # pragma: no cover - заглушка
         raise RevitAPIUnavailableError("WallUtils.IsWallJoinAllowedAtEnd")
@@ -265,9 +326,67 @@ class WallUtils(_StubBase):
 class WorksetId(_StubBase):
     """Заглушка WorksetId."""
 
+    __slots__ = ()
+
     InvalidWorksetId = object()
 
 
+class WorksharingUtils(_StubBase):
+    """Заглушка WorksharingUtils."""
+
+    __slots__ = ()
+
+    @staticmethod
+    def GetCheckoutStatus(*args, **kwargs):  # pragma: no cover - заглушка
+        raise RevitAPIUnavailableError("WorksharingUtils.GetCheckoutStatus")
+
+
+def _prepopulate_members(enum_class, names):
+    """Записать известные члены перечисления прямо в словарь класса.
+
+    Обращение к ним становится обычным поиском атрибута класса без вызова
+    ``_DynamicAttributeMeta.__getattr__``; неизвестные имена по-прежнему
+    обрабатывает метакласс.
+    """
+
+    for name in names:
+        setattr(enum_class, name, name)
+
+
+_prepopulate_members(
+    BuiltInParameter,
+    (
+        "ALL_MODEL_INSTANCE_COMMENTS",
+        "ALL_MODEL_MARK",
+        "DESIGN_OPTION_ID",
+        "EDITED_BY",
+        "HOST_ID_PARAM",
+        "PHASE_CREATED",
+        "PHASE_DEMOLISHED",
+        "STRUCTURAL_MATERIAL_PARAM",
+        "VIEW_PHASE",
+        "WALL_ATTR_FIRE_RATING",
+        "WALL_ATTR_ROOM_BOUNDING",
+        "WALL_BASE_CONSTRAINT",
+        "WALL_BASE_OFFSET",
+        "WALL_FIRE_RATING_PARAM",
+        "WALL_HEIGHT_TYPE",
+        "WALL_KEY_REF_PARAM",
+        "WALL_PHASE_CREATED",
+        "WALL_PHASE_DEMOLISHED",
+        "WALL_STRUCTURAL_SIGNIFICANT",
+        "WALL_TOP_OFFSET",
+        "WALL_USER_HEIGHT_PARAM",
+    ),
+)
+_prepopulate_members(CheckoutStatus, ("NotOwned", "OwnedByCurrentUser", "OwnedByOtherUser"))
+_prepopulate_members(
+    MaterialFunctionAssignment,
+    ("Finish1", "Finish2", "Insulation", "Membrane", "StructuralDeck", "Structure", "Substrate"),
+)
+_prepopulate_members(StorageType, ("Double", "ElementId", "Integer", "String"))
+
+
 class ArgumentException(Exception):
     """Заглушка Autodesk.Revit.Exceptions.ArgumentException."""
 
@@ -283,6 +402,8 @@ class OperationCanceledException(Exception):
 class ISelectionFilter(_StubBase):
     """Заглушка интерфейса фильтра выбора."""
 
+    __slots__ = ()
+
     def AllowElement(self, element):  # pragma: no cover - заглушка
         raise RevitAPIUnavailableError("ISelectionFilter.AllowElement")
 